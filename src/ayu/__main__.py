@@ -15,7 +15,14 @@ from ayu.utils import uv_is_installed, project_is_uv_managed, ayu_is_run_as_tool
     type=click.Path(exists=True, file_okay=False, path_type=Path),
     required=False,
 )
-def cli(ctx, tests_path):
+@click.option(
+    "--socket",
+    "socket_path",
+    envvar="AYU_SOCKET",
+    type=click.Path(dir_okay=False),
+    help="Communicate with pytest over this unix domain socket instead of TCP",
+)
+def cli(ctx, tests_path, socket_path):
     if ayu_is_run_as_tool():
         print("ayu as tool")
     else:
@@ -30,10 +37,10 @@ def cli(ctx, tests_path):
         return
 
     if tests_path:
-        app = AyuApp(test_path=tests_path)
+        app = AyuApp(test_path=tests_path, socket_path=socket_path)
         app.run()
     elif ctx.invoked_subcommand is None:
-        app = AyuApp()
+        app = AyuApp(socket_path=socket_path)
         app.run()
     else:
         pass
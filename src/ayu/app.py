@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 from textual import work, on
@@ -12,10 +13,22 @@ from textual_tags import Tag
 from watchfiles import awatch, PythonFilter
 
 from ayu.event_dispatcher import EventDispatcher
-from ayu.constants import WEB_SOCKET_HOST, WEB_SOCKET_PORT
+from ayu.classes.test_store import TestStore
+from ayu.classes.search_index import SearchIndex
+from ayu.classes.text_index import TextIndex
+from ayu.classes.report_store import ReportStore
+from ayu.constants import (
+    WEB_SOCKET_HOST,
+    WEB_SOCKET_PORT,
+    WEB_SOCKET_PATH,
+    PREVIEW_DEBOUNCE_TIME,
+)
 from ayu.utils import (
     EventType,
     NodeType,
+    expand_flat_tree,
+    get_report_store_path,
+    get_source_file,
     run_all_tests,
     remove_ansi_escapes,
     run_plugin_collection,
@@ -75,15 +88,44 @@ class AyuApp(App):
         test_path: Path | None = None,
         host: str | None = None,
         port: int | None = None,
+        socket_path: str | None = None,
+        report_store_path: Path | None = None,
         *args,
         **kwargs,
     ):
         self.host = host or os.environ.get("AYU_HOST") or WEB_SOCKET_HOST
         self.port = port or int(os.environ.get("AYU_PORT", 0)) or WEB_SOCKET_PORT
+        self.socket_path = (
+            socket_path or os.environ.get("AYU_SOCKET") or WEB_SOCKET_PATH
+        )
         self.dispatcher = None
         self.test_path = test_path
+        # state of all collected tests, shared by the tree, search and runner
+        self.test_store = TestStore()
+        self.search_index = SearchIndex(store=self.test_store)
+        self.text_index = TextIndex(store=self.test_store)
+        # details of the reports, pytest subprocesses write into the same file
+        self.report_store = ReportStore(
+            path=report_store_path
+            or get_report_store_path(port=self.port, socket_path=self.socket_path)
+        )
+        self.report_store.clear()
         super().__init__(*args, **kwargs)
 
+    @property
+    def subprocess_env(self) -> dict[str, str]:
+        """Environment of the pytest subprocesses, so their plugin sends the events
+        to this app and writes the reports into its store"""
+        env = {
+            **os.environ,
+            "AYU_HOST": self.host,
+            "AYU_PORT": str(self.port),
+            "AYU_REPORT_STORE": str(self.report_store.path),
+        }
+        if self.socket_path:
+            env["AYU_SOCKET"] = str(self.socket_path)
+        return env
+
     def compose(self):
         yield Header()
         yield Footer(show_command_palette=False)
@@ -99,10 +141,11 @@ class AyuApp(App):
         yield CoverageExplorer()
         with Horizontal():
             with Vertical(id="vertical_test_tree"):
-                yield TestTree(label="Tests", id="testtree").data_bind(
+                yield TestTree(
+                    label="Tests", id="testtree", store=self.test_store
+                ).data_bind(
                     filter=AyuApp.filter,
                     filtered_data_test_tree=AyuApp.data_test_tree,
-                    filtered_counter_total_tests=AyuApp.counter_total_tests,
                 )
                 yield TreeFilter().data_bind(
                     test_results_ready=AyuApp.test_results_ready, markers=AyuApp.markers
@@ -179,15 +222,61 @@ class AyuApp(App):
             event_type=EventType.COLLECTION,
             handler=lambda data: self.update_app_data(data),
         )
+        self.dispatcher.register_handler(
+            event_type=EventType.COLLECTION_PART,
+            handler=lambda data: self.update_app_data_part(data),
+        )
+        self.dispatcher.register_handler(
+            event_type=EventType.REPORT,
+            handler=lambda data: self.index_failed_reports(data),
+        )
         self.query_one(TestTree).focus()
 
         self.collect_initial_plugins()
         self.collect_initial_test_tree()
 
+    def on_unmount(self):
+        # waits for a report, which is read in a thread right now
+        self.report_store.close()
+
+    @work(group="Report Index", description="Indexes the output of failed tests")
+    async def index_failed_reports(self, data: list[dict]):
+        """Only failures are searchable, the summaries come without output"""
+        failed_nodeids = []
+        for report in data:
+            if report["outcome"] == "failed":
+                failed_nodeids.append(report["nodeid"])
+            else:
+                # the old failure output of a fixed test is not found anymore
+                self.text_index.reports.remove(doc_id=report["nodeid"])
+        reports = await asyncio.to_thread(self.report_store.get_many, failed_nodeids)
+        # the test could be reported again meanwhile
+        self.text_index.index_reports(
+            [report for report in reports if report["outcome"] == "failed"]
+        )
+
     def update_app_data(self, data):
-        self.data_test_tree = data["tree"]
+        if "nodes" in data:
+            data = expand_flat_tree(data=data)
+        # if the collection was streamed, the tree is already complete
+        if "tree" in data:
+            self.data_test_tree = data["tree"]
         self.counter_total_tests = data["meta"]["test_count"]
         self.markers = data["meta"]["markers"]
+        self.sub_title = ""
+
+    def update_app_data_part(self, data):
+        """Add a part of the collection, while pytest is still collecting"""
+        if "nodes" in data:
+            data = expand_flat_tree(data=data)
+        test_tree = self.query_one(TestTree)
+        if data["meta"]["is_first_part"]:
+            self.set_reactive(AyuApp.data_test_tree, {})
+            self.counter_total_tests = 0
+            test_tree.reset_tree(tree_data=self.data_test_tree)
+        test_tree.merge_tree(tree_data=data["tree"])
+        self.counter_total_tests += data["meta"]["test_count"]
+        self.sub_title = f"Collecting tests: {data['meta']['collected']} collected"
 
     def update_plugin_dict(self, data):
         # if not self.plugin_dict:
@@ -211,7 +300,7 @@ class AyuApp(App):
             tests_to_run=self.test_path,
             pytest_options=["--co"],
         )
-        await run_test_collection(command=command)
+        await run_test_collection(command=command, env=self.subprocess_env)
 
     @work(
         exclusive=True,
@@ -224,20 +313,27 @@ class AyuApp(App):
             tests_to_run=self.test_path,
             pytest_options=["--help"],
         )
-        await run_plugin_collection(command=command)
+        await run_plugin_collection(command=command, env=self.subprocess_env)
 
     @work(exclusive=True, description="Keeps the websocket alive", group="Websocket")
     async def start_socket(self):
-        self.dispatcher = EventDispatcher(host=self.host, port=self.port)
-        self.notify(
-            f"Websocket Started at\n[orange]{self.host}:{self.port}[/]", timeout=1
+        self.dispatcher = EventDispatcher(
+            host=self.host, port=self.port, socket_path=self.socket_path
         )
+        self.dispatcher.on_slow_handler = self.log_slow_handler
+        address = self.socket_path or f"{self.host}:{self.port}"
+        self.notify(f"Websocket Started at\n[orange]{address}[/]", timeout=1)
         try:
             await self.dispatcher.start()
         except OSError as e:
             self.log.error(e)
             pass
 
+    def log_slow_handler(self, event_type: EventType, handler, duration: float):
+        self.log.warning(
+            f"{event_type} handler {handler.__qualname__} took {duration:.3f}s"
+        )
+
     def on_key(self, event: Key):
         if event.key == "w":
             for worker in self.workers:
@@ -279,19 +375,32 @@ class AyuApp(App):
 
     @on(Tree.NodeHighlighted)
     def update_test_preview(self, event: Tree.NodeHighlighted):
-        detail_view = self.query_one(DetailView)
-        detail_view.file_path_to_preview = Path(event.node.data["path"])
-        if event.node.data["type"] in [
+        # while navigating fast, only the last highlighted node is shown
+        self.show_test_preview(node_data=event.node.data)
+
+    @work(exclusive=True, group="Preview", description="Shows the highlighted test")
+    async def show_test_preview(self, node_data: dict):
+        # cancelled, if another node is highlighted meanwhile
+        await asyncio.sleep(PREVIEW_DEBOUNCE_TIME)
+
+        if node_data["type"] in [
             NodeType.FUNCTION,
             NodeType.COROUTINE,
             NodeType.CLASS,
         ]:
-            detail_view.test_start_line_no = event.node.data["lineno"]
+            # read the file in a thread, the preview uses the cached content
+            await asyncio.to_thread(get_source_file, node_data["path"])
+            start_line_no = node_data["lineno"]
         else:
-            detail_view.test_start_line_no = -1
+            start_line_no = -1
+        self.query_one(DetailView).show_test(
+            file_path=Path(node_data["path"]), start_line_no=start_line_no
+        )
 
-        self.query_one(ToggleRule).test_result = event.node.data["status"]
-        self.query_one(TestResultDetails).selected_node_id = event.node.data["nodeid"]
+        self.query_one(ToggleRule).test_result = self.test_store.get_status(
+            node_id=self.test_store.ids[node_data["nodeid"]]
+        )
+        self.query_one(TestResultDetails).selected_node_id = node_data["nodeid"]
 
     @on(Button.Pressed, "#button_watcher")
     def toggle_file_watcher(self, event: Button.Pressed):
@@ -311,7 +420,7 @@ class AyuApp(App):
 
     @on(Button.Pressed, "#button_run")
     def toggle_test_run(self, event: Button.Pressed):
-        if self.query_one(TestTree).marked_tests:
+        if self.test_store.has_marked_tests:
             self.action_run_marked_tests()
         else:
             self.action_run_tests()
@@ -357,7 +466,7 @@ class AyuApp(App):
             plugins=None,
             tests_to_run=tests_to_run,
         )
-        runner = await run_all_tests(command=command)
+        runner = await run_all_tests(command=command, env=self.subprocess_env)
         while runner:
             if runner.returncode is not None:
                 break
@@ -375,9 +484,9 @@ class AyuApp(App):
 
         command = build_command(
             plugins=None,
-            tests_to_run=self.query_one(TestTree).marked_tests,
+            tests_to_run=self.test_store.marked_nodeids(),
         )
-        runner = await run_all_tests(command=command)
+        runner = await run_all_tests(command=command, env=self.subprocess_env)
         while runner:
             if runner.returncode is not None:
                 break
@@ -395,13 +504,17 @@ class AyuApp(App):
     def action_clear_test_results(self):
         self.test_results_ready = False
         self.query_one(TestTree).reset_test_results()
+        self.query_one(TestResultDetails).report_data = {}
+        self.report_store.clear()
+        self.text_index.clear_reports()
         for log in self.query(Log):
             log.clear()
 
     def action_open_search(self):
         def select_searched_nodeid(nodeid: str | None):
             if nodeid:
-                node = self.query_one(TestTree).get_node_by_nodeid(nodeid=nodeid)
+                # collapsed parents of lazy trees add the node first
+                node = self.query_one(TestTree).reveal_node(nodeid=nodeid)
                 self.query_one(TestTree).select_node(node=node)
 
         self.push_screen(ModalSearch(), callback=select_searched_nodeid)
@@ -411,10 +524,10 @@ class AyuApp(App):
         # try except is needed
         try:
             if action == "run_tests":
-                if self.query_one(TestTree).marked_tests:
+                if self.test_store.has_marked_tests:
                     return False
             if action == "run_marked_tests":
-                if not self.query_one(TestTree).marked_tests:
+                if not self.test_store.has_marked_tests:
                     return False
         except NoMatches:
             return True
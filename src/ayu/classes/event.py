@@ -1,21 +1,156 @@
 from __future__ import annotations
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import json
+import struct
+import zlib
 
 from ayu.utils import EventType
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 
 @dataclass
 class Event:
     event_type: EventType
     event_payload: dict | list
 
-    def serialize(self) -> str:
+    def serialize(self, codec: str | None = None) -> str | bytes:
+        return get_codec(name=codec).encode(event=self)
+
+    @classmethod
+    def deserialize(cls, message: str | bytes, codec: str | None = None) -> Event:
+        return get_codec(name=codec).decode(message=message)
+
+
+class EventCodec(ABC):
+    """Wire format of events, the name is used as websocket subprotocol
+    to negotiate the codec between plugin and app"""
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, event: Event) -> str | bytes: ...
+
+    @abstractmethod
+    def decode(self, message: str | bytes) -> Event: ...
+
+    def compress(self, message: str | bytes) -> str | bytes:
+        """Text based codecs send messages uncompressed"""
+        return message
+
+
+class LegacyJsonCodec(EventCodec):
+    """Compact json, used if no codec was negotiated"""
+
+    name = "json"
+
+    def encode(self, event: Event) -> str:
         return json.dumps(
-            {"type": self.event_type, "payload": self.event_payload}, indent=4
+            {"type": event.event_type, "payload": event.event_payload},
+            separators=(",", ":"),
         )
 
-    @classmethod
-    def deserialize(cls, json_str: str) -> Event:
-        event_dict = json.loads(json_str)
-        return cls(event_type=event_dict["type"], event_payload=event_dict["payload"])
+    def decode(self, message: str | bytes) -> Event:
+        event_dict = json.loads(message)
+        return Event(event_type=event_dict["type"], event_payload=event_dict["payload"])
+
+
+class BinaryCodec(EventCodec):
+    """Binary message with a fixed size header, followed by the compact json payload,
+    which is compressed with zlib for large events
+
+    The header holds the wire id of the event type and a flag byte,
+    message boundaries are already given by the websocket frames"""
+
+    # the version changes, if the header or the ids of existing event types change
+    name = "ayu.binary.v1"
+    HEADER = struct.Struct("!BB")
+    FLAG_ZLIB = 0b1
+    # fastest level, tracebacks and logs compress well anyway
+    ZLIB_LEVEL = 1
+    # fixed, so plugin and app of different versions agree on them,
+    # new event types get the next free id
+    EVENT_TYPE_IDS = {
+        EventType.COLLECTION: 0,
+        EventType.SCHEDULED: 1,
+        EventType.OUTCOME: 2,
+        EventType.REPORT: 3,
+        EventType.COVERAGE: 4,
+        EventType.PLUGIN: 5,
+        EventType.OPTIONS: 6,
+        EventType.DEBUG: 7,
+        EventType.COLLECTION_PART: 8,
+    }
+    EVENT_TYPES = {
+        event_type_id: event_type
+        for event_type, event_type_id in EVENT_TYPE_IDS.items()
+    }
+
+    def encode(self, event: Event) -> bytes:
+        header = self.HEADER.pack(self.EVENT_TYPE_IDS[event.event_type], 0)
+        return header + self.encode_payload(payload=event.event_payload)
+
+    def decode(self, message: str | bytes) -> Event:
+        event_type_id, flags = self.HEADER.unpack_from(message)
+        data = memoryview(message)[self.HEADER.size :]
+        if flags & self.FLAG_ZLIB:
+            data = memoryview(zlib.decompress(data))
+        return Event(
+            event_type=self.EVENT_TYPES[event_type_id],
+            event_payload=self.decode_payload(data=data),
+        )
+
+    def compress(self, message: str | bytes) -> str | bytes:
+        event_type_id, flags = self.HEADER.unpack_from(message)
+        return self.HEADER.pack(event_type_id, flags | self.FLAG_ZLIB) + zlib.compress(
+            memoryview(message)[self.HEADER.size :], level=self.ZLIB_LEVEL
+        )
+
+    def encode_payload(self, payload: dict | list) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode()
+
+    def decode_payload(self, data: memoryview) -> dict | list:
+        return json.loads(bytes(data))
+
+
+class MsgpackCodec(BinaryCodec):
+    """Binary message with a msgpack payload, only offered if msgpack is installed"""
+
+    name = "ayu.msgpack.v1"
+
+    def encode_payload(self, payload: dict | list) -> bytes:
+        return msgpack.packb(payload)
+
+    def decode_payload(self, data: memoryview) -> dict | list:
+        return msgpack.unpackb(data)
+
+
+LEGACY_CODEC = LegacyJsonCodec()
+# ordered by preference
+CODECS: dict[str, EventCodec] = {
+    codec.name: codec
+    for codec in (
+        MsgpackCodec() if msgpack is not None else None,
+        BinaryCodec(),
+    )
+    if codec is not None
+}
+
+
+def get_codec(name: str | None) -> EventCodec:
+    if name is None:
+        return LEGACY_CODEC
+    return CODECS.get(name, LEGACY_CODEC)
+
+
+def select_codec(connection, subprotocols: list[str]) -> str | None:
+    """Pick the preferred codec offered by the plugin,
+    clients without any codec use the legacy json format"""
+    for codec_name in CODECS:
+        if codec_name in subprotocols:
+            return codec_name
+    return None
@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any
+
+# fields only loaded, once a test is selected
+DETAIL_FIELDS = ("longreprtext", "caplog")
+
+
+def summarize_report(report: dict[str, Any]) -> dict[str, Any]:
+    """Report without the captured output, sent to the app while tests are running"""
+    return {key: value for key, value in report.items() if key not in DETAIL_FIELDS}
+
+
+class ReportStore:
+    """Reports of the last runs in a sqlite file, indexed by nodeid
+
+    The plugin writes the full report of every test, the app only receives
+    the summaries and reads the details of the selected test. Also xdist workers
+    write to the same file, sqlite locks it for them"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # the app reads in worker threads, the lock guards the shared connection
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        # readers do not block the writing plugin
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS reports (nodeid TEXT PRIMARY KEY, report TEXT)"
+        )
+
+    def add(self, report: dict[str, Any]):
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?)",
+                (report["nodeid"], json.dumps(report)),
+            )
+
+    def get(self, nodeid: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT report FROM reports WHERE nodeid = ?", (nodeid,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, nodeids: list[str]) -> list[dict[str, Any]]:
+        return [
+            report
+            for nodeid in nodeids
+            if (report := self.get(nodeid=nodeid)) is not None
+        ]
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM reports")
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,94 @@
+from collections import defaultdict
+import heapq
+
+from ayu.classes.test_store import TestStore
+from ayu.constants import SEARCH_MAX_RESULTS
+
+
+class SearchIndex:
+    """Index over the nodeids of a test store, to find the best search matches
+    without fuzzy matching every node
+
+    Every character and node type has a flag per node. A node can only match
+    a fuzzy query, if it contains all characters of the query, so the flags of
+    the query characters are combined to get the candidates. The index is rebuilt
+    once the store changed"""
+
+    def __init__(self, store: TestStore):
+        self.store = store
+        # nodeids of the store the index was built from
+        self.nodeids: list[str] | None = None
+        self.size = 0
+        self.lowered: list[str] = []
+        self.char_bits: dict[str, int] = {}
+        self.type_bits: dict[str, int] = {}
+
+    def update(self):
+        """Rebuild the index, if the store was cleared or nodes were added"""
+        if self.nodeids is self.store.nodeids and self.size == len(self.store):
+            return
+        size = len(self.store)
+        char_columns: defaultdict[str, bytearray] = defaultdict(lambda: bytearray(size))
+        type_columns: defaultdict[str, bytearray] = defaultdict(lambda: bytearray(size))
+        self.lowered = [nodeid.lower() for nodeid in self.store.nodeids]
+        for node_id, nodeid in enumerate(self.lowered):
+            for char in set(nodeid):
+                char_columns[char][node_id] = 1
+            type_columns[self.store.node_data[node_id]["type"]][node_id] = 1
+
+        self.char_bits = {
+            char: self.store.bits(column) for char, column in char_columns.items()
+        }
+        self.type_bits = {
+            node_type: self.store.bits(column)
+            for node_type, column in type_columns.items()
+        }
+        self.nodeids = self.store.nodeids
+        self.size = size
+
+    def search(
+        self,
+        query: str,
+        node_types: list[str] | None = None,
+        limit: int = SEARCH_MAX_RESULTS,
+    ) -> list[int]:
+        """Ids of the best matching visible nodes, all node types if none are given"""
+        self.update()
+        bits = self.store.bits(self.store.visible)
+        if node_types:
+            type_bits = 0
+            for node_type in node_types:
+                type_bits |= self.type_bits.get(node_type, 0)
+            bits &= type_bits
+
+        query = query.lower()
+        for char in set(query):
+            bits &= self.char_bits.get(char, 0)
+        node_ids = self.store.select(bits)
+        if not query:
+            return node_ids[:limit]
+
+        matches = [
+            node_id
+            for node_id in node_ids
+            if is_subsequence(query=query, text=self.lowered[node_id])
+        ]
+        return heapq.nlargest(
+            limit, matches, key=lambda node_id: self.rank(query=query, node_id=node_id)
+        )
+
+    def rank(self, query: str, node_id: int) -> tuple[bool, bool, int]:
+        """Prefer nodes with the query in their name, then anywhere in the nodeid"""
+        nodeid = self.lowered[node_id]
+        name = nodeid.rpartition("::")[2].rpartition("/")[2]
+        return (query in name, query in nodeid, -len(nodeid))
+
+
+def is_subsequence(query: str, text: str) -> bool:
+    """Characters of the query appear in the text in the same order, like a fuzzy match"""
+    position = 0
+    for char in query:
+        position = text.find(char, position) + 1
+        if not position:
+            return False
+    return True
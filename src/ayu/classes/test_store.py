@@ -0,0 +1,126 @@
+from array import array
+from collections import defaultdict
+from itertools import compress
+import sys
+from typing import Any, Iterable
+
+from ayu.utils import TestOutcome
+
+# codes of the status column, "" for tests without result
+STATUSES: list[str] = ["", *TestOutcome]
+STATUS_CODES: dict[str, int] = {status: code for code, status in enumerate(STATUSES)}
+
+
+class TestStore:
+    """State of all collected nodes, shared by the test tree, the search and the runner
+
+    Every node gets an integer id in the order it was added, the mutable state
+    lives in one column per field, indexed by that id. Columns of flags hold 0 or 1,
+    so they can be combined as bitmasks to select nodes without a loop in python.
+    Static data like name, type and children stays in the node data dicts"""
+
+    __test__ = False
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids: dict[str, int] = {}
+        self.nodeids: list[str] = []
+        self.node_data: list[dict[Any, Any]] = []
+        # id of the parent, -1 for top level nodes
+        self.parents = array("l")
+        self.is_test = bytearray()
+        self.status = bytearray()
+        self.favourite = bytearray()
+        # tests not hidden by the filter and parents with visible tests
+        self.visible = bytearray()
+        self.duration = array("d")
+        self.test_count = 0
+        # marker -> ids of all nodes with this marker
+        self.marker_index: defaultdict[str, list[int]] = defaultdict(list)
+        # ids of visible favourite tests, in the order they were marked
+        self.marked: dict[int, None] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodeids)
+
+    def __contains__(self, nodeid: str) -> bool:
+        return nodeid in self.ids
+
+    def add(self, node_data: dict[Any, Any], parent_id: int = -1) -> int:
+        node_id = len(self.nodeids)
+        nodeid = sys.intern(node_data["nodeid"])
+        is_test = not node_data["children"]
+        self.ids[nodeid] = node_id
+        self.nodeids.append(nodeid)
+        self.node_data.append(node_data)
+        self.parents.append(parent_id)
+        self.is_test.append(is_test)
+        self.status.append(STATUS_CODES[node_data["status"]])
+        self.favourite.append(node_data["favourite"])
+        self.visible.append(0)
+        self.duration.append(0.0)
+        self.test_count += is_test
+        for marker in node_data["markers"]:
+            self.marker_index[marker].append(node_id)
+        return node_id
+
+    def get_parent_ids(self, node_id: int):
+        parent_id = self.parents[node_id]
+        while parent_id != -1:
+            yield parent_id
+            parent_id = self.parents[parent_id]
+
+    def get_status(self, node_id: int) -> str:
+        return STATUSES[self.status[node_id]]
+
+    def set_status(self, node_id: int, status: str) -> str:
+        """Set the status of a node and return the old one"""
+        old_status = STATUSES[self.status[node_id]]
+        self.status[node_id] = STATUS_CODES[status]
+        return old_status
+
+    def set_visible(self, node_id: int, is_visible: bool):
+        self.visible[node_id] = is_visible
+        self.update_marked(node_id=node_id)
+
+    def set_favourite(self, node_id: int, is_fav: bool):
+        self.favourite[node_id] = is_fav
+        self.update_marked(node_id=node_id)
+
+    def update_marked(self, node_id: int):
+        if self.is_test[node_id] and self.favourite[node_id] and self.visible[node_id]:
+            self.marked[node_id] = None
+        else:
+            self.marked.pop(node_id, None)
+
+    @property
+    def has_marked_tests(self) -> bool:
+        return bool(self.marked)
+
+    def reset_results(self):
+        self.status[:] = bytes(len(self))
+        self.duration = array("d", bytes(len(self) * self.duration.itemsize))
+
+    def bits(self, column: bytearray | bytes) -> int:
+        """Column of flags as an integer, one byte per node"""
+        return int.from_bytes(column, "big")
+
+    def status_bits(self, statuses: Iterable[str]) -> int:
+        """Flags of all nodes with one of the given statuses"""
+        codes = {STATUS_CODES[status] for status in statuses}
+        table = bytes(code in codes for code in range(256))
+        return self.bits(self.status.translate(table))
+
+    def select(self, bits: int) -> list[int]:
+        """Ids of all nodes, whose flag is set"""
+        return list(compress(range(len(self)), bits.to_bytes(len(self), "big")))
+
+    def marked_nodeids(self) -> list[str]:
+        """Nodeids of all visible favourite tests, in the order of the collection"""
+        return [self.nodeids[node_id] for node_id in sorted(self.marked)]
+
+    def visible_ids(self) -> list[int]:
+        """Ids of all visible tests and their parents, also of collapsed ones"""
+        return self.select(self.bits(self.visible))
@@ -0,0 +1,153 @@
+from collections import Counter, defaultdict
+import heapq
+import math
+import os
+import re
+
+from ayu.classes.test_store import TestStore
+from ayu.constants import SEARCH_MAX_RESULTS
+from ayu.utils import NodeType, get_source_file
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# nodes with a lineno pointing to their definition
+SOURCE_NODE_TYPES = (NodeType.FUNCTION, NodeType.COROUTINE, NodeType.CLASS)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """Token -> documents containing the token, with the number of occurrences"""
+
+    def __init__(self):
+        self.postings: defaultdict[str, dict[str, int]] = defaultdict(dict)
+        # document -> tokens of the document, to remove it before indexing it again
+        self.documents: dict[str, Counter] = {}
+
+    def add(self, doc_id: str, text: str):
+        self.remove(doc_id=doc_id)
+        tokens = Counter(tokenize(text))
+        self.documents[doc_id] = tokens
+        for token, count in tokens.items():
+            self.postings[token][doc_id] = count
+
+    def remove(self, doc_id: str):
+        for token in self.documents.pop(doc_id, ()):
+            postings = self.postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+
+    def search(self, tokens: list[str]) -> dict[str, float]:
+        """Scores of the documents containing all tokens,
+        the last token also matches as prefix, while it is still typed"""
+        scores: dict[str, float] = {}
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                terms = [term for term in self.postings if term.startswith(token)]
+            else:
+                terms = [token] if token in self.postings else []
+
+            token_scores: defaultdict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self.postings[term]
+                # rare tokens weigh more
+                weight = math.log(1 + len(self.documents) / len(postings))
+                for doc_id, count in postings.items():
+                    token_scores[doc_id] += count * weight
+
+            if position == 0:
+                scores = dict(token_scores)
+            else:
+                scores = {
+                    doc_id: score + token_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in token_scores
+                }
+            if not scores:
+                break
+        return scores
+
+
+class TextIndex:
+    """Full text search over the source of the tests, including their docstrings,
+    and over the failure output of the last reports
+
+    Sources are indexed per file and only read again, once the mtime of the file changed"""
+
+    def __init__(self, store: TestStore):
+        self.store = store
+        # documents are "path::lineno" of a definition
+        self.sources = InvertedIndex()
+        # documents are the nodeids of the reports
+        self.reports = InvertedIndex()
+        # path -> mtime and linenos of the indexed file
+        self.indexed_files: dict[str, tuple[float, set[int]]] = {}
+        # source document -> nodeids defined there, e.g. all parametrized tests
+        self.document_nodeids: dict[str, list[str]] = {}
+
+    def update_sources(self):
+        """Index the sources of all collected tests, unchanged files are skipped"""
+        linenos_by_path: defaultdict[str, set[int]] = defaultdict(set)
+        self.document_nodeids = defaultdict(list)
+        for node_data in self.store.node_data:
+            if node_data["type"] in SOURCE_NODE_TYPES:
+                linenos_by_path[node_data["path"]].add(node_data["lineno"])
+                doc_id = f"{node_data['path']}::{node_data['lineno']}"
+                self.document_nodeids[doc_id].append(node_data["nodeid"])
+
+        for path, linenos in linenos_by_path.items():
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if self.indexed_files.get(path) != (mtime, linenos):
+                self.index_file(path=path, mtime=mtime, linenos=linenos)
+
+        # files which are not collected anymore
+        for path in set(self.indexed_files) - set(linenos_by_path):
+            self.remove_file(path=path)
+
+    def index_file(self, path: str, mtime: float, linenos: set[int]):
+        self.remove_file(path=path)
+        source_file = get_source_file(file_path=path)
+        for lineno in linenos:
+            self.sources.add(
+                doc_id=f"{path}::{lineno}",
+                text=source_file.get_definition(start_line_no=lineno),
+            )
+        self.indexed_files[path] = (mtime, linenos)
+
+    def remove_file(self, path: str):
+        if path not in self.indexed_files:
+            return
+        _, linenos = self.indexed_files.pop(path)
+        for lineno in linenos:
+            self.sources.remove(doc_id=f"{path}::{lineno}")
+
+    def index_reports(self, reports: list[dict]):
+        for report in reports:
+            self.reports.add(doc_id=report["nodeid"], text=report["longreprtext"])
+
+    def clear_reports(self):
+        self.reports = InvertedIndex()
+
+    def search(self, query: str, limit: int = SEARCH_MAX_RESULTS) -> list[str]:
+        """Nodeids of the best matching visible nodes"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores: defaultdict[str, float] = defaultdict(float)
+        for doc_id, score in self.sources.search(tokens=tokens).items():
+            for nodeid in self.document_nodeids.get(doc_id, ()):
+                scores[nodeid] += score
+        for nodeid, score in self.reports.search(tokens=tokens).items():
+            scores[nodeid] += score
+
+        visible_nodeids = [
+            nodeid
+            for nodeid in scores
+            if nodeid in self.store and self.store.visible[self.store.ids[nodeid]]
+        ]
+        return heapq.nlargest(limit, visible_nodeids, key=scores.__getitem__)
@@ -4,7 +4,35 @@ from platformdirs import user_data_dir
 
 WEB_SOCKET_HOST = os.environ.get("AYU_HOST") or "localhost"
 WEB_SOCKET_PORT = int(os.environ.get("AYU_PORT", 0)) or 1337
+# If set, communicate over this unix domain socket instead of host and port
+WEB_SOCKET_PATH = os.environ.get("AYU_SOCKET") or None
 MAX_EVENT_SIZE = 2**30
+# Events the plugin can queue before applying the queue policy
+EVENT_QUEUE_SIZE = 10_000
+# Seconds to wait for queued events to be sent when pytest exits
+EVENT_FLUSH_TIMEOUT = 10.0
+# Events larger than this many bytes are sent zlib compressed
+EVENT_COMPRESS_THRESHOLD = 2**14
+# Test outcomes are sent in batches, once the batch is full
+# or the interval in milliseconds is over
+OUTCOME_BATCH_SIZE = 500
+OUTCOME_FLUSH_INTERVAL = 100
+# Reports hold the whole failure output, so fewer of them are sent in one event
+REPORT_BATCH_SIZE = 50
+# Above this many tests, nodes of the test tree are only created once their parent is expanded
+LAZY_TREE_THRESHOLD = int(os.environ.get("AYU_LAZY_TREE_THRESHOLD", 0)) or 10_000
+# Measured files analysed per process and sent to ayu as one part of the coverage,
+# by default the coverage is analysed by one process per cpu
+COVERAGE_CHUNK_SIZE = 50
+COVERAGE_WORKERS = 0
+# Number of best matches shown in the search
+SEARCH_MAX_RESULTS = 100
+# Number of test files kept in memory for the preview
+SOURCE_CACHE_SIZE = 128
+# Seconds the highlighted test has to stay the same, before its preview is shown
+PREVIEW_DEBOUNCE_TIME = 0.05
+# Lines of a failure report loaded at once, earlier lines are loaded on scroll
+REPORT_PAGE_SIZE = 500
 # WEB_SOCKET_HOST = "localhost"
 # WEB_SOCKET_PORT = 1337
 
@@ -27,3 +55,5 @@ PLUGIN_JSON_PATH = Path(
     user_data_dir(appname="ayu", appauthor=False, ensure_exists=True)
 )
 PLUGIN_JSON_FILE = PLUGIN_JSON_PATH.joinpath("pytest_plugins.json")
+# Details of the test reports, written by the plugin and read by the app
+REPORT_STORE_PATH = PLUGIN_JSON_PATH.joinpath("reports")
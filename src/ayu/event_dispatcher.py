@@ -1,68 +1,155 @@
-from typing import Callable
-from collections import defaultdict
+from typing import Any, Callable
+from collections import defaultdict, deque
+from contextlib import ExitStack, suppress
+from dataclasses import asdict, dataclass
+import inspect
+import logging
+import threading
+import time
 
-from websockets.asyncio.server import serve
-from websockets.asyncio.client import connect
-from websockets.exceptions import ConnectionClosedOK, WebSocketException
+from websockets.asyncio.server import serve, unix_serve
+from websockets.sync.client import (
+    ClientConnection,
+    connect as sync_connect,
+    unix_connect as sync_unix_connect,
+)
+from websockets.exceptions import ConnectionClosed, WebSocketException
 import asyncio
 
-from ayu.constants import MAX_EVENT_SIZE, WEB_SOCKET_HOST, WEB_SOCKET_PORT
-from ayu.classes.event import Event
-from ayu.utils import EventType, get_ayu_websocket_host_port
+from ayu.constants import (
+    EVENT_COMPRESS_THRESHOLD,
+    EVENT_FLUSH_TIMEOUT,
+    EVENT_QUEUE_SIZE,
+    MAX_EVENT_SIZE,
+    WEB_SOCKET_HOST,
+    WEB_SOCKET_PATH,
+    WEB_SOCKET_PORT,
+)
+from ayu.classes.event import CODECS, Event, get_codec, select_codec
+from ayu.utils import (
+    EventType,
+    QueuePolicy,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HandlerStats:
+    """Time spent in the handlers of one event type"""
+
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    slow_calls: int = 0
+
+    def add(self, duration: float, is_slow: bool):
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.slow_calls += is_slow
 
 
 class EventDispatcher:
-    def __init__(self, host: str = WEB_SOCKET_HOST, port: int = WEB_SOCKET_PORT):
+    # messages larger than this are decoded in a thread,
+    # to not block the app while decoding e.g. a large collection
+    DECODE_IN_THREAD_SIZE = 2**16
+    # handlers taking longer are reported to `on_slow_handler`
+    SLOW_HANDLER_TIME = 0.1
+
+    def __init__(
+        self,
+        host: str = WEB_SOCKET_HOST,
+        port: int = WEB_SOCKET_PORT,
+        socket_path: str | None = WEB_SOCKET_PATH,
+    ):
         self.host = host
         self.port = port
+        # listen on a unix domain socket instead of host and port
+        self.socket_path = socket_path
         self.running = False
         self.server = None
-        self.event_handler: defaultdict[EventType | None, list] = defaultdict(list)
+        self.event_handler: dict[EventType, list[Callable]] = {
+            event_type: [] for event_type in EventType
+        }
+        self.handler_stats: defaultdict[EventType, HandlerStats] = defaultdict(
+            HandlerStats
+        )
+        self.on_slow_handler: Callable[[EventType, Callable, float], Any] | None = None
+        # decoded events waiting to be dispatched
+        self.events: asyncio.Queue[Event] = asyncio.Queue()
+        self._dispatch_task: asyncio.Task | None = None
 
         self.data = ""
 
     # Handler
     async def handler(self, websocket):
+        """Receives and decodes messages, dispatching happens in a separate task
+        so slow handlers don't stall the intake"""
+        codec = get_codec(name=websocket.subprotocol)
         while True:
             try:
                 msg = await websocket.recv()
-            except ConnectionClosedOK:
+            except ConnectionClosed:
                 break
 
-            if self.event_handler:
-                event = Event.deserialize(msg)
-                event_type = event.event_type
-                event_payload = event.event_payload
-                match event_type:
-                    case EventType.COLLECTION:
-                        handlers = self.event_handler[EventType.COLLECTION]
-                    case EventType.OUTCOME:
-                        handlers = self.event_handler[EventType.OUTCOME]
-                    case EventType.REPORT:
-                        handlers = self.event_handler[EventType.REPORT]
-                    case EventType.SCHEDULED:
-                        handlers = self.event_handler[EventType.SCHEDULED]
-                    case EventType.COVERAGE:
-                        handlers = self.event_handler[EventType.COVERAGE]
-                    case EventType.PLUGIN:
-                        handlers = self.event_handler[EventType.PLUGIN]
-                    case EventType.OPTIONS:
-                        handlers = self.event_handler[EventType.OPTIONS]
-                    case EventType.DEBUG:
-                        handlers = self.event_handler[EventType.DEBUG]
-
-            if handlers:
-                for handler in handlers:
-                    handler(event_payload)
+            if len(msg) > self.DECODE_IN_THREAD_SIZE:
+                event = await asyncio.to_thread(codec.decode, msg)
+            else:
+                event = codec.decode(message=msg)
+            self.events.put_nowait(event)
 
             self.data = msg
 
+    async def dispatch_events(self):
+        while True:
+            events = [await self.events.get()]
+            while not self.events.empty():
+                events.append(self.events.get_nowait())
+            for event in self.merge_events(events=events):
+                await self.dispatch(event=event)
+
+    @staticmethod
+    def merge_events(events: list[Event]) -> list[Event]:
+        """Merge consecutive list payloads of the same type, e.g. outcome batches
+        that piled up during a slow handler, to dispatch them at once"""
+        merged_events: list[Event] = []
+        for event in events:
+            if (
+                merged_events
+                and merged_events[-1].event_type == event.event_type
+                and isinstance(merged_events[-1].event_payload, list)
+                and isinstance(event.event_payload, list)
+            ):
+                merged_events[-1].event_payload.extend(event.event_payload)
+            else:
+                merged_events.append(event)
+        return merged_events
+
+    async def dispatch(self, event: Event):
+        for handler in self.event_handler.get(event.event_type, ()):
+            start = time.perf_counter()
+            try:
+                result = handler(event.event_payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                # a failing handler must not stop the dispatching of later events
+                logger.exception(f"Handler {handler} failed for {event.event_type}")
+            duration = time.perf_counter() - start
+
+            is_slow = duration > self.SLOW_HANDLER_TIME
+            self.handler_stats[event.event_type].add(duration=duration, is_slow=is_slow)
+            if is_slow and self.on_slow_handler:
+                self.on_slow_handler(event.event_type, handler, duration)
+
     def register_handler(self, event_type: EventType, handler: Callable):
+        """Handlers can be sync or async functions, taking the event payload"""
         self.event_handler[event_type].append(handler)
 
     def unregister_handler(self, event_type: EventType):
         # with asyncio.Lock():
-        self.event_handler.pop(event_type)
+        self.event_handler[event_type] = []
 
     # Start Websocket Server
     async def start(self):
@@ -73,35 +160,350 @@ class EventDispatcher:
         await asyncio.get_running_loop().create_future()
 
     async def start_socket_server(self):
-        self.server = await serve(
-            self.handler, self.host, self.port, max_size=MAX_EVENT_SIZE
-        )
-        await self.server.wait_closed()
+        server_options = {
+            "max_size": MAX_EVENT_SIZE,
+            "select_subprotocol": select_codec,
+            # plugins compressing large events themselves decline it
+            "compression": "deflate",
+        }
+        self._dispatch_task = asyncio.create_task(self.dispatch_events())
+        try:
+            if self.socket_path:
+                self.server = await unix_serve(
+                    self.handler, path=self.socket_path, **server_options
+                )
+            else:
+                self.server = await serve(
+                    self.handler, self.host, self.port, **server_options
+                )
+            await self.server.wait_closed()
+        finally:
+            self._dispatch_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._dispatch_task
 
     def get_data(self):
         return self.data
 
 
-# send events
-async def send_event(
-    event: Event, host: str = WEB_SOCKET_HOST, port: int = WEB_SOCKET_PORT
-):
-    # host, port = get_ayu_websocket_host_port()
-    uri = f"ws://{host}:{port}"
+class EventQueue:
+    """Bounded queue between the pytest hooks and the sender thread,
+    the policy decides what happens if the queue is full"""
+
+    def __init__(
+        self,
+        maxsize: int = EVENT_QUEUE_SIZE,
+        policy: QueuePolicy = QueuePolicy.COALESCE,
+    ):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._events: deque[Event] = deque()
+        self._unfinished = 0
+        self._closed = False
+        self._condition = threading.Condition()
 
-    async with connect(uri) as websocket:
-        await websocket.send(message=event.serialize())
+    def __len__(self) -> int:
+        return len(self._events)
 
+    def put(self, event: Event) -> bool:
+        """Add an event, returns False if the event was dropped"""
+        with self._condition:
+            if len(self._events) >= self.maxsize:
+                match self.policy:
+                    case QueuePolicy.BLOCK:
+                        self._condition.wait_for(
+                            lambda: len(self._events) < self.maxsize or self._closed
+                        )
+                        if self._closed:
+                            # nobody takes events from a closed queue anymore
+                            self.dropped += 1
+                            return False
+                    case QueuePolicy.DROP_NEWEST:
+                        self.dropped += 1
+                        return False
+                    case QueuePolicy.DROP_OLDEST:
+                        self._drop_oldest()
+                    case QueuePolicy.COALESCE:
+                        if self._coalesce(event=event):
+                            return True
+                        self._drop_oldest()
 
-async def is_websocket_connected():
-    host, port = get_ayu_websocket_host_port()
-    uri = f"ws://{host}:{port}"
-    try:
-        async with connect(uri) as _websocket:
+            self._events.append(event)
+            self._unfinished += 1
+            self._condition.notify_all()
+        return True
+
+    def get(self) -> Event | None:
+        """Wait for the next event, returns None once closed and drained"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._events or self._closed)
+            if not self._events:
+                return None
+            event = self._events.popleft()
+            self._condition.notify_all()
+            return event
+
+    def task_done(self):
+        with self._condition:
+            self._unfinished -= 1
+            self._condition.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until all queued events are handled"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._unfinished == 0, timeout=timeout
+            )
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _drop_oldest(self):
+        self._events.popleft()
+        self._unfinished -= 1
+        self.dropped += 1
+
+    def _coalesce(self, event: Event) -> bool:
+        """Merge list payloads into the last queued event of the same type"""
+        last_event = self._events[-1]
+        if (
+            last_event.event_type == event.event_type
+            and isinstance(last_event.event_payload, list)
+            and isinstance(event.event_payload, list)
+        ):
+            last_event.event_payload.extend(event.event_payload)
             return True
-    except (WebSocketException, ConnectionRefusedError, OSError):
         return False
 
 
-def check_connection():
-    return asyncio.run(is_websocket_connected())
+@dataclass
+class WireStats:
+    """Amount of sent events and bytes, before and after compression"""
+
+    events: int = 0
+    compressed_events: int = 0
+    bytes_encoded: int = 0
+    bytes_sent: int = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.bytes_encoded / self.bytes_sent if self.bytes_sent else 1.0
+
+    def add(self, bytes_encoded: int, bytes_sent: int):
+        self.events += 1
+        self.compressed_events += bytes_encoded != bytes_sent
+        self.bytes_encoded += bytes_encoded
+        self.bytes_sent += bytes_sent
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"compression_ratio": round(self.compression_ratio, 2)}
+
+
+class EventSender:
+    """Sends events from the pytest plugin to the ayu app over a single
+    websocket connection, which is kept open for the whole pytest session
+
+    Once started, events are queued and sent from a background thread,
+    so the test run never waits on the app.
+    Events larger than `compress_threshold` bytes are sent zlib compressed,
+    if the negotiated codec supports it, 0 disables compression"""
+
+    # seconds to wait before trying to reconnect after a failed attempt
+    RECONNECT_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        host: str = WEB_SOCKET_HOST,
+        port: int = WEB_SOCKET_PORT,
+        socket_path: str | None = WEB_SOCKET_PATH,
+        queue_size: int = EVENT_QUEUE_SIZE,
+        queue_policy: QueuePolicy = QueuePolicy.COALESCE,
+        compress_threshold: int = EVENT_COMPRESS_THRESHOLD,
+    ):
+        self.host = host
+        self.port = port
+        # connect over a unix domain socket instead of host and port
+        self.socket_path = socket_path
+        self.websocket: ClientConnection | None = None
+        self.queue = EventQueue(maxsize=queue_size, policy=queue_policy)
+        self.compress_threshold = compress_threshold
+        self.stats = WireStats()
+        self._thread: threading.Thread | None = None
+        self._connection_stack = ExitStack()
+        self._next_reconnect = 0.0
+
+    @property
+    def uri(self) -> str:
+        if self.socket_path:
+            return "ws://localhost/"
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def connected(self) -> bool:
+        return self.websocket is not None
+
+    def connect(self) -> bool:
+        connect_options = {
+            "max_size": MAX_EVENT_SIZE,
+            "subprotocols": list(CODECS),
+            # large events are compressed by the codec already,
+            # without threshold, leave it to permessage-deflate
+            "compression": None if self.compress_threshold else "deflate",
+        }
+        try:
+            if self.socket_path:
+                connection = sync_unix_connect(
+                    path=self.socket_path, uri=self.uri, **connect_options
+                )
+            else:
+                connection = sync_connect(self.uri, **connect_options)
+            self.websocket = self._connection_stack.enter_context(connection)
+        except (WebSocketException, OSError):
+            self.websocket = None
+            self._next_reconnect = time.monotonic() + self.RECONNECT_INTERVAL
+            return False
+        return True
+
+    def start(self):
+        """Start the background thread, which sends the queued events"""
+        self._thread = threading.Thread(
+            target=self._run, name="ayu-event-sender", daemon=True
+        )
+        self._thread.start()
+
+    def send(self, event: Event) -> bool:
+        if self._thread is None:
+            return self._send_now(event=event)
+        if not self.connected and time.monotonic() < self._next_reconnect:
+            # the app is not reachable, don't fill the queue until the next attempt
+            return False
+        return self.queue.put(event=event)
+
+    def flush(self, timeout: float | None = EVENT_FLUSH_TIMEOUT) -> bool:
+        """Wait until all queued events are sent"""
+        if self._thread is None:
+            return True
+        return self.queue.join(timeout=timeout)
+
+    def close(self, timeout: float | None = EVENT_FLUSH_TIMEOUT):
+        if self._thread is not None:
+            self.flush(timeout=timeout)
+            self.queue.close()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self._disconnect()
+
+    def _run(self):
+        while (event := self.queue.get()) is not None:
+            try:
+                self._send_now(event=event)
+            except Exception:
+                # e.g. a payload which can't be encoded, the next events are still sent
+                logger.exception(f"Sending {event.event_type} event failed")
+            finally:
+                self.queue.task_done()
+
+    def _send_now(self, event: Event) -> bool:
+        # retry once with a fresh connection, e.g. if the app was restarted
+        for _ in range(2):
+            if self.websocket is None:
+                if time.monotonic() < self._next_reconnect or not self.connect():
+                    return False
+            message = self._encode(event=event)
+            try:
+                self.websocket.send(message)
+                return True
+            except (WebSocketException, OSError):
+                self._disconnect()
+        # also the fresh connection failed
+        self._next_reconnect = time.monotonic() + self.RECONNECT_INTERVAL
+        return False
+
+    def _encode(self, event: Event) -> str | bytes:
+        # codec was negotiated during the handshake
+        codec = get_codec(name=self.websocket.subprotocol)
+        message = codec.encode(event=event)
+        bytes_encoded = len(message)
+        if self.compress_threshold and bytes_encoded > self.compress_threshold:
+            message = codec.compress(message=message)
+        self.stats.add(bytes_encoded=bytes_encoded, bytes_sent=len(message))
+        return message
+
+    def _disconnect(self):
+        self._connection_stack.close()
+        self.websocket = None
+
+
+class EventBatcher:
+    """Collects payloads of one event type and passes them to the sender
+    as a single event, once `batch_size` payloads are collected or
+    `flush_interval` seconds passed since the first one
+
+    The interval is watched by one flusher thread for the whole session,
+    it is started with the first payload"""
+
+    def __init__(
+        self,
+        sender: EventSender,
+        event_type: EventType,
+        batch_size: int,
+        flush_interval: float,
+    ):
+        self.sender = sender
+        self.event_type = event_type
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch: list = []
+        # time, at which the current batch is sent at the latest
+        self._deadline = 0.0
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def add(self, payload: dict):
+        with self._condition:
+            self._batch.append(payload)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+            elif len(self._batch) == 1:
+                self._deadline = time.monotonic() + self.flush_interval
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="ayu-event-batcher", daemon=True
+                    )
+                    self._thread.start()
+                self._condition.notify_all()
+
+    def flush(self):
+        with self._condition:
+            self._flush()
+
+    def close(self):
+        """Send the remaining payloads and stop the flusher thread"""
+        with self._condition:
+            self._flush()
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                if not self._batch:
+                    self._condition.wait()
+                elif (remaining := self._deadline - time.monotonic()) > 0:
+                    self._condition.wait(timeout=remaining)
+                else:
+                    self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.sender.send(
+                event=Event(event_type=self.event_type, event_payload=self._batch)
+            )
+            self._batch = []
@@ -1,19 +1,30 @@
 import os
-import asyncio
 import pytest
-from pytest import Config, TestReport, Session, Parser
+from pytest import CollectReport, Config, Item, TestReport, Session, Parser
 from _pytest.terminal import TerminalReporter
 
-from ayu.event_dispatcher import send_event, check_connection
+from ayu.event_dispatcher import EventBatcher, EventSender
 from ayu.classes.event import Event
+from ayu.classes.report_store import ReportStore, summarize_report
+from ayu.constants import (
+    COVERAGE_WORKERS,
+    EVENT_COMPRESS_THRESHOLD,
+    EVENT_QUEUE_SIZE,
+    OUTCOME_BATCH_SIZE,
+    OUTCOME_FLUSH_INTERVAL,
+    REPORT_BATCH_SIZE,
+)
 from ayu.utils import (
     EventType,
+    QueuePolicy,
     TestOutcome,
     get_pytest_current_options,
-    remove_ansi_escapes,
+    get_report_store_path,
+    test_report_to_dict,
     build_dict_tree,
+    flatten_dict_tree,
     build_plugin_dict,
-    get_coverage_data,
+    iter_coverage_data,
 )
 
 # import logging
@@ -29,6 +40,48 @@ def pytest_addoption(parser: Parser) -> None:
         default=False,
         help="Disable Ayu plugin functionality, i.e. do not send events to websocket",
     )
+    group.addoption(
+        "--ayu-queue-size",
+        action="store",
+        type=int,
+        default=EVENT_QUEUE_SIZE,
+        help="Maximum number of events waiting to be sent to ayu",
+    )
+    group.addoption(
+        "--ayu-queue-policy",
+        action="store",
+        default=QueuePolicy.COALESCE.value,
+        choices=[policy.value for policy in QueuePolicy],
+        help="What to do with new events if the event queue is full",
+    )
+    group.addoption(
+        "--ayu-batch-size",
+        action="store",
+        type=int,
+        default=OUTCOME_BATCH_SIZE,
+        help="Maximum number of test outcomes sent to ayu in one event",
+    )
+    group.addoption(
+        "--ayu-flush-interval",
+        action="store",
+        type=int,
+        default=OUTCOME_FLUSH_INTERVAL,
+        help="Milliseconds to collect test outcomes before sending them to ayu",
+    )
+    group.addoption(
+        "--ayu-coverage-workers",
+        action="store",
+        type=int,
+        default=COVERAGE_WORKERS,
+        help="Processes analysing the coverage for ayu, 0 for one per cpu",
+    )
+    group.addoption(
+        "--ayu-compress-threshold",
+        action="store",
+        type=int,
+        default=EVENT_COMPRESS_THRESHOLD,
+        help="Compress events larger than this many bytes, 0 to disable",
+    )
 
 
 @pytest.hookimpl(trylast=True)
@@ -42,36 +95,69 @@ class Ayu:
         self.config = config
         self.connected = False
 
-        if check_connection():
+        # keep one connection open for the whole session
+        # and send events from a background thread
+        self.sender = EventSender(
+            queue_size=config.getoption("--ayu-queue-size"),
+            queue_policy=QueuePolicy(config.getoption("--ayu-queue-policy")),
+            compress_threshold=config.getoption("--ayu-compress-threshold"),
+        )
+        if self.sender.connect():
             print("Websocket connected")
             self.connected = True
+            self.sender.start()
         else:
             self.connected = False
             print("Websocket not connected")
+        # items collected since the last streamed part of the collection
+        self.collected_items: list[Item] = []
+        self.streamed_nodeids: list[str] = []
+        self.streamed_markers: set[str] = set()
+        self.outcome_batcher = EventBatcher(
+            sender=self.sender,
+            event_type=EventType.OUTCOME,
+            batch_size=config.getoption("--ayu-batch-size"),
+            flush_interval=config.getoption("--ayu-flush-interval") / 1000,
+        )
+        # reports are streamed per test, to inspect failures while the run continues,
+        # their details are only stored and read by the app for the selected test
+        self.report_store = (
+            ReportStore(
+                # set by the app for its pytest runs
+                path=os.environ.get("AYU_REPORT_STORE")
+                or get_report_store_path(
+                    port=self.sender.port, socket_path=self.sender.socket_path
+                )
+            )
+            if self.connected
+            else None
+        )
+        self.report_batcher = EventBatcher(
+            sender=self.sender,
+            event_type=EventType.REPORT,
+            batch_size=REPORT_BATCH_SIZE,
+            flush_interval=config.getoption("--ayu-flush-interval") / 1000,
+        )
         self.load_current_options()
         self.load_used_plugin_infos()
 
     def load_current_options(self):
         if self.connected and self.config.getoption("--help"):
             option_dict = get_pytest_current_options(conf=self.config)
-            asyncio.run(
-                send_event(
-                    event=Event(
-                        event_type=EventType.OPTIONS,
-                        event_payload={"option_dict": option_dict},
-                    )
+            self.sender.send(
+                event=Event(
+                    event_type=EventType.OPTIONS,
+                    event_payload={"option_dict": option_dict},
                 )
             )
 
     def load_used_plugin_infos(self):
         if self.connected and self.config.getoption("--help"):
             plugin_dict = build_plugin_dict(conf=self.config)
-            asyncio.run(
-                send_event(
-                    event=Event(
-                        event_type=EventType.PLUGIN,
-                        event_payload={"plugin_dict": plugin_dict},
-                    )
+            self.sender.send(
+                event=Event(
+                    event_type=EventType.PLUGIN,
+                    event_payload={"plugin_dict": plugin_dict},
                 )
             )
 
@@ -79,48 +165,75 @@ class Ayu:
     @pytest.hookimpl(tryfirst=True)
     def pytest_runtestloop(self, session: Session):
         if self.connected and session.config.getoption("--collect-only"):
-            asyncio.run(
-                send_event(
-                    event=Event(
-                        event_type=EventType.DEBUG,
-                        event_payload={"test": "test"},
-                        # event_payload={"no_items":session.testscollected,"items":f"{session.items}"},
-                    )
+            self.sender.send(
+                event=Event(
+                    event_type=EventType.DEBUG,
+                    event_payload={"test": "test"},
+                    # event_payload={"no_items":session.testscollected,"items":f"{session.items}"},
                 )
-                # ,debug_mode=True
             )
 
+    # stream the test tree while collecting
+    def pytest_itemcollected(self, item: Item):
+        if self.connected and self.config.getoption("--collect-only"):
+            self.collected_items.append(item)
+
+    def pytest_collectreport(self, report: CollectReport):
+        # reports of a collector are created after its children are collected,
+        # so send all items of a module at once
+        if "::" in report.nodeid or not self.collected_items:
+            return
+
+        part = build_dict_tree(items=self.collected_items)
+        part["meta"]["is_first_part"] = not self.streamed_nodeids
+        self.streamed_nodeids.extend(item.nodeid for item in self.collected_items)
+        self.streamed_markers.update(part["meta"]["markers"])
+        part["meta"]["collected"] = len(self.streamed_nodeids)
+        self.collected_items = []
+
+        self.sender.send(
+            event=Event(
+                event_type=EventType.COLLECTION_PART,
+                event_payload=flatten_dict_tree(data=part),
+            )
+        )
+
     # build test tree
     def pytest_collection_finish(self, session: Session):
         if self.connected:
             print("Connected to Ayu")
             if session.config.getoption("--collect-only"):
-                tree = build_dict_tree(items=session.items)
-                asyncio.run(
-                    send_event(
-                        event=Event(
-                            event_type=EventType.COLLECTION,
-                            event_payload=tree,
-                        )
-                    ),
+                nodeids = [item.nodeid for item in session.items]
+                if self.streamed_nodeids == nodeids:
+                    # the streamed parts built the same tree already
+                    tree = {
+                        "meta": {
+                            "test_count": len(nodeids),
+                            "markers": list(self.streamed_markers),
+                        }
+                    }
+                else:
+                    tree = flatten_dict_tree(data=build_dict_tree(items=session.items))
+                self.sender.send(
+                    event=Event(
+                        event_type=EventType.COLLECTION,
+                        event_payload=tree,
+                    )
                 )
             else:
-                asyncio.run(
-                    send_event(
-                        event=Event(
-                            event_type=EventType.SCHEDULED,
-                            event_payload=[item.nodeid for item in session.items],
-                        )
+                self.sender.send(
+                    event=Event(
+                        event_type=EventType.SCHEDULED,
+                        event_payload=[item.nodeid for item in session.items],
                     )
                 )
         return
 
     # gather status updates during run
     def pytest_runtest_logreport(self, report: TestReport):
-        if self.config.pluginmanager.hasplugin("xdist") and (
-            "PYTEST_XDIST_WORKER" not in os.environ
-        ):
-            pass
+        # in distributed runs the xdist workers send the reports of their tests,
+        # "dsession" is only registered with `-n`, not if xdist is just installed
+        if self.config.pluginmanager.hasplugin("dsession"):
             return
 
         is_relevant = (report.when == "call") or (
@@ -129,17 +242,19 @@ class Ayu:
         )
 
         if self.connected and is_relevant:
-            asyncio.run(
-                send_event(
-                    event=Event(
-                        event_type=EventType.OUTCOME,
-                        event_payload={
-                            "nodeid": report.nodeid,
-                            "outcome": report.outcome.upper(),
-                        },
-                    )
-                )
+            self.outcome_batcher.add(
+                {
+                    "nodeid": report.nodeid,
+                    "outcome": report.outcome.upper(),
+                    "duration": report.duration,
+                }
             )
+        # failing teardowns are reported after the call
+        if self.connected and (is_relevant or report.failed):
+            report_dict = test_report_to_dict(report=report)
+            # stored first, the app reads it once the summary arrives
+            self.report_store.add(report=report_dict)
+            self.report_batcher.add(summarize_report(report=report_dict))
 
     # summary after run for each tests
     @pytest.hookimpl(trylast=True)
@@ -149,6 +264,10 @@ class Ayu:
         # option_dict = {option:value for option, value in self.config.option._get_kwargs()}
         # pprint(option_dict)
 
+        # send outstanding outcomes and reports before the summary events
+        self.outcome_batcher.flush()
+        self.report_batcher.flush()
+
         # Summary part of individual Workers
         if self.config.pluginmanager.hasplugin("xdist") and (
             "PYTEST_XDIST_WORKER" not in os.environ
@@ -156,64 +275,38 @@ class Ayu:
             # Needs to run within workers for correct report
             # if pytest-xdist is available
             if self.config.pluginmanager.hasplugin("_cov") and self.connected:
-                coverage_dict = get_coverage_data()
-
-                asyncio.run(
-                    send_event(
-                        event=Event(
-                            event_type=EventType.COVERAGE,
-                            event_payload={
-                                "coverage_dict": coverage_dict,
-                            },
-                        )
-                    )
-                )
+                self.send_coverage_data()
 
         else:
             if self.config.pluginmanager.hasplugin("_cov") and self.connected:
-                coverage_dict = get_coverage_data()
-
-                asyncio.run(
-                    send_event(
-                        event=Event(
-                            event_type=EventType.COVERAGE,
-                            event_payload={
-                                "coverage_dict": coverage_dict,
-                            },
-                        )
-                    )
-                )
-
-        report_dict = {}
-        # warning report has no report.when
-        for outcome, reports in terminalreporter.stats.items():
-            # raise Exception(terminalreporter.stats.keys())
-            if outcome in ["", "deselected"]:
-                continue
-            for report in reports:
-                report_dict[report.nodeid] = {
-                    "nodeid": report.nodeid,
-                    # Not in warning report
-                    # TODO Handle warning reports
-                    "when": report.when,
-                    "caplog": report.caplog,
-                    "longreprtext": remove_ansi_escapes(report.longreprtext),
-                    "duration": report.duration,
-                    "outcome": report.outcome,
-                    "lineno": report.location[1],
-                    "otherloc": report.location[2],
-                }
+                self.send_coverage_data()
 
-        # import json
+    def send_coverage_data(self):
+        """Send the coverage in parts, so the table fills while files are analysed"""
+        workers = self.config.getoption("--ayu-coverage-workers") or None
+        for part_index, coverage_dict in enumerate(iter_coverage_data(workers=workers)):
+            self.sender.send(
+                event=Event(
+                    event_type=EventType.COVERAGE,
+                    event_payload={
+                        "coverage_dict": coverage_dict,
+                        "is_first_part": part_index == 0,
+                    },
+                )
+            )
 
+    # send remaining events and close the session connection
+    def pytest_unconfigure(self, config: Config):
+        self.outcome_batcher.close()
+        self.report_batcher.close()
         if self.connected:
-            asyncio.run(
-                send_event(
-                    event=Event(
-                        event_type=EventType.REPORT,
-                        event_payload={
-                            "report": report_dict,
-                        },
-                    )
+            self.sender.flush()
+            self.sender.send(
+                event=Event(
+                    event_type=EventType.DEBUG,
+                    event_payload={"wire_stats": self.sender.stats.to_dict()},
                 )
             )
+        self.sender.close()
+        if self.report_store is not None:
+            self.report_store.close()
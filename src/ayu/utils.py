@@ -1,6 +1,12 @@
 from types import FunctionType, NoneType
-from typing import Any
+from typing import Any, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+import multiprocessing
+import ast
+import hashlib
 import os
 import shutil
 import re
@@ -10,10 +16,17 @@ import subprocess
 
 import asyncio
 from pytest import Config, OptionGroup
-from pytest import Item, Class, Function
+from pytest import Item, Class, Function, TestReport
 from _pytest.nodes import Node
 
-from ayu.constants import WEB_SOCKET_PORT, WEB_SOCKET_HOST
+from ayu.constants import (
+    WEB_SOCKET_PORT,
+    WEB_SOCKET_HOST,
+    WEB_SOCKET_PATH,
+    SOURCE_CACHE_SIZE,
+    REPORT_STORE_PATH,
+    COVERAGE_CHUNK_SIZE,
+)
 
 
 class NodeType(str, Enum):
@@ -33,6 +46,8 @@ class EventType(str, Enum):
     PLUGIN = "PLUGIN"
     OPTIONS = "OPTIONS"
     DEBUG = "DEBUG"
+    # part of the collection, sent while pytest is still collecting
+    COLLECTION_PART = "COLLECTION_PART"
 
 
 class TestOutcome(str, Enum):
@@ -46,6 +61,23 @@ class TestOutcome(str, Enum):
     ERROR = "XPASSED"
 
 
+class QueuePolicy(str, Enum):
+    BLOCK = "block"
+    DROP_NEWEST = "drop-newest"
+    DROP_OLDEST = "drop-oldest"
+    COALESCE = "coalesce"
+
+
+class ReportLineType(str, Enum):
+    TEXT = "TEXT"
+    # line of the test, where the error was raised, marked with ">"
+    FAILED_LINE = "FAILED_LINE"
+    # explanation of the error, marked with "E"
+    ERROR = "ERROR"
+    # path:lineno of a traceback entry
+    LOCATION = "LOCATION"
+
+
 class OptionType(str, Enum):
     INT = "INT"
     LIST = "LIST"
@@ -55,35 +87,38 @@ class OptionType(str, Enum):
     UNKNOWN = "UNKNOWN"
 
 
-async def run_plugin_collection(command: str):
+async def run_plugin_collection(command: str, env: dict[str, str] | None = None):
     """Collect All Tests without running them"""
 
     process = await asyncio.create_subprocess_shell(
         command,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.STDOUT,
+        env=env,
     )
     await process.wait()
 
 
-async def run_test_collection(command: str):
+async def run_test_collection(command: str, env: dict[str, str] | None = None):
     """Collect All Tests without running them"""
 
     process = await asyncio.create_subprocess_shell(
         command,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.STDOUT,
+        env=env,
     )
     await process.wait()
 
 
-async def run_all_tests(command: str):
+async def run_all_tests(command: str, env: dict[str, str] | None = None):
     """Run all selected tests"""
 
     return await asyncio.create_subprocess_shell(
         command,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.STDOUT,
+        env=env,
     )
 
 
@@ -97,25 +132,82 @@ def get_nice_tooltip(node_data: dict) -> str | None:
     return tooltip_str
 
 
-def get_preview_test(file_path: str, start_line_no: int) -> str:
-    """Read the test file from nodeid and use the linenumber
-    and some rules to display the test function"""
+@dataclass
+class SourceFile:
+    lines: list[str]
+    # start line -> end line of all function and class definitions, 0-based
+    extents: dict[int, int]
+
+    def get_definition(self, start_line_no: int) -> str:
+        """Source of the definition starting at the linenumber,
+        files which can't be parsed fall back to the line based rules"""
+        end_line_no = self.extents.get(start_line_no)
+        if end_line_no is None:
+            return extract_test_source(
+                file_lines=self.lines, start_line_no=start_line_no
+            )
+        return "".join(self.lines[start_line_no:end_line_no]).rstrip()
+
+
+def get_source_file(file_path: str | Path) -> SourceFile:
+    """Cached content of a file, read again once it was modified"""
+    stat = os.stat(file_path)
+    return read_source_file(
+        file_path=str(file_path), mtime_ns=stat.st_mtime_ns, size=stat.st_size
+    )
+
+
+@lru_cache(maxsize=SOURCE_CACHE_SIZE)
+def read_source_file(file_path: str, mtime_ns: int, size: int) -> SourceFile:
     with open(Path(file_path), "r") as file:
-        file_lines = file.readlines()
+        source = file.read()
+    return SourceFile(
+        lines=source.splitlines(keepends=True), extents=get_definition_extents(source)
+    )
+
+
+def get_definition_extents(source: str) -> dict[int, int]:
+    """Lines of all functions and classes, also nested ones. Decorated definitions
+    start at their first decorator, like the lineno reported by pytest"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return {}
+    extents = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start_line_no = min(
+                [node.lineno, *(decorator.lineno for decorator in node.decorator_list)]
+            )
+            extents[start_line_no - 1] = node.end_lineno
+            extents.setdefault(node.lineno - 1, node.end_lineno)
+    return extents
+
+
+def get_preview_test(file_path: str, start_line_no: int) -> str:
+    """Source of the test function or class starting at the linenumber"""
+    return get_source_file(file_path=file_path).get_definition(
+        start_line_no=start_line_no
+    )
+
+
+def extract_test_source(file_lines: list[str], start_line_no: int) -> str:
+    """Lines of the test starting at the linenumber,
+    until the next definition after a blank line"""
+    last_line_is_blank = False
+    end_line_no = None
+    for line_no, line in enumerate(file_lines[start_line_no:], start=start_line_no):
+        if not line.strip():
+            last_line_is_blank = True
+            continue
+        if (
+            line.strip().startswith(("def ", "class ", "async def ", "@"))
+            and last_line_is_blank
+        ):
+            end_line_no = line_no - 1
+            break
         last_line_is_blank = False
-        end_line_no = None
-        for line_no, line in enumerate(file_lines[start_line_no:], start=start_line_no):
-            if not line.strip():
-                last_line_is_blank = True
-                continue
-            if (
-                line.strip().startswith(("def ", "class ", "async def ", "@"))
-                and last_line_is_blank
-            ):
-                end_line_no = line_no - 1
-                break
-            last_line_is_blank = False
-        return "".join(file_lines[start_line_no:end_line_no]).rstrip()
+    return "".join(file_lines[start_line_no:end_line_no]).rstrip()
 
 
 def get_ayu_websocket_host_port() -> tuple[str, int]:
@@ -124,12 +216,53 @@ def get_ayu_websocket_host_port() -> tuple[str, int]:
     return host, port
 
 
+def get_ayu_socket_path() -> str | None:
+    return os.environ.get("AYU_SOCKET", WEB_SOCKET_PATH) or None
+
+
+def get_report_store_path(port: int, socket_path: str | None = None) -> Path:
+    """One file per socket or port, so parallel instances keep their reports apart"""
+    if socket_path:
+        # instances communicating over sockets all keep the default port
+        socket_key = hashlib.sha1(os.path.abspath(socket_path).encode()).hexdigest()
+        return REPORT_STORE_PATH.joinpath(f"reports_{socket_key[:12]}.sqlite")
+    return REPORT_STORE_PATH.joinpath(f"reports_{port}.sqlite")
+
+
 def remove_ansi_escapes(string_to_remove: str) -> str:
     """Remove ansi escaped strings from colored pytest output"""
     ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
     return ansi_escape.sub("", string_to_remove)
 
 
+REPORT_LOCATION_PATTERN = re.compile(r"^\S+:\d+: \S")
+
+
+def classify_report_lines(lines: Iterable[str]) -> Iterator[ReportLineType]:
+    """Type of every line of a failure report, one line at a time,
+    so only the lines which are shown need to be classified"""
+    in_native_traceback = False
+    for line in lines:
+        if line.startswith("Traceback (most recent call last)"):
+            # --tb=native, the exception follows the indented frames
+            in_native_traceback = True
+            yield ReportLineType.TEXT
+        elif in_native_traceback:
+            if line.startswith((" ", "\t")) or not line:
+                yield ReportLineType.TEXT
+            else:
+                in_native_traceback = False
+                yield ReportLineType.ERROR
+        elif line.startswith("E ") or line == "E":
+            yield ReportLineType.ERROR
+        elif line.startswith(">"):
+            yield ReportLineType.FAILED_LINE
+        elif REPORT_LOCATION_PATTERN.match(line):
+            yield ReportLineType.LOCATION
+        else:
+            yield ReportLineType.TEXT
+
+
 def uv_is_installed():
     if shutil.which("uv"):
         return True
@@ -152,50 +285,203 @@ def ayu_is_run_as_tool():
 
 def build_dict_tree(items: list[Item]) -> dict:
     markers = set()
+    # nodeid -> node dict of all nodes already in the tree,
+    # so every node is created and looked up only once
+    node_index: dict[str, dict[Any, Any]] = {}
 
     def create_node(node: Node) -> dict[Any, Any]:
         markers.update([mark.name for mark in node.own_markers])
-        return test_node_to_dict(node=node)
-
-    def add_node(node_list: list[Node], sub_tree: dict):
-        if not node_list:
-            return
-
-        # take root node
-        current_node = node_list.pop(0)
-        node_dict = create_node(node=current_node)
-
-        existing_node = next(
-            (
-                node
-                for node in sub_tree["children"]
-                if node["nodeid"] == current_node.nodeid
-            ),
-            None,
-        )
-
-        if existing_node is None:
-            sub_tree["children"].append(node_dict)
-            existing_node = node_dict
-
-        add_node(
-            node_list=node_list,
-            sub_tree=existing_node,
-        )
+        node_dict = test_node_to_dict(node=node)
+        node_index[node.nodeid] = node_dict
+        return node_dict
 
     tree: dict[Any, Any] = {}
     root = items[0].listchain()[1]
     tree[root.name] = create_node(node=root)
 
     for item in items:
-        # gets all parents except session
-        parts_to_collect = item.listchain()[1:]
-        add_node(node_list=parts_to_collect[1:], sub_tree=tree[root.name])
+        # walk up until a node is found, which is already part of the tree,
+        # the nodes directly below the session are all merged into the root
+        new_nodes = []
+        current_node = item
+        while (
+            current_node.nodeid not in node_index
+            and current_node.parent.parent is not None
+        ):
+            new_nodes.append(current_node)
+            current_node = current_node.parent
+
+        sub_tree = node_index.get(current_node.nodeid, tree[root.name])
+        for node in reversed(new_nodes):
+            node_dict = create_node(node=node)
+            sub_tree["children"].append(node_dict)
+            sub_tree = node_dict
 
     return {"tree": tree, "meta": {"test_count": len(items), "markers": list(markers)}}
 
 
-def get_coverage_data(coverage_file=".coverage"):
+def flatten_dict_tree(data: dict) -> dict:
+    """Flat, index based version of a `build_dict_tree` result
+
+    Nodes are stored in a table of columns, a node's id is its index and
+    parents come before their children. Types, paths and markers are interned
+    into string tables, nodeids which can be derived from the parent are None.
+    Values, which follow from the parent or are the same for all collected nodes
+    (`parent_name`, `parent_type`, `favourite`, `status`, `children`), are left out.
+    """
+    nodes: dict[str, list] = {
+        "name": [],
+        "nodeid": [],
+        "parent": [],
+        "type": [],
+        "path": [],
+        "lineno": [],
+        "markers": [],
+    }
+    types: dict[str, int] = {}
+    paths: dict[str, int] = {}
+    markers: dict[str, int] = {}
+    root_parents = []
+
+    def add_node(node: dict[Any, Any], parent_index: int | None, parent_nodeid: str):
+        index = len(nodes["name"])
+        nodes["name"].append(node["name"])
+        nodes["nodeid"].append(
+            None
+            if node["nodeid"] == f"{parent_nodeid}::{node['name']}"
+            else node["nodeid"]
+        )
+        nodes["parent"].append(parent_index)
+        nodes["type"].append(types.setdefault(node["type"], len(types)))
+        nodes["path"].append(paths.setdefault(node["path"], len(paths)))
+        nodes["lineno"].append(node["lineno"])
+        nodes["markers"].append(
+            [markers.setdefault(marker, len(markers)) for marker in node["markers"]]
+        )
+        for child in node["children"]:
+            add_node(node=child, parent_index=index, parent_nodeid=node["nodeid"])
+
+    for root in data["tree"].values():
+        root_parents.append([root["parent_name"], root["parent_type"]])
+        add_node(node=root, parent_index=None, parent_nodeid="")
+
+    # markers of the meta data are the same as the marker table
+    markers.update(
+        {
+            marker: len(markers)
+            for marker in data["meta"]["markers"]
+            if marker not in markers
+        }
+    )
+    return {
+        "nodes": nodes,
+        "types": list(types),
+        "paths": list(paths),
+        "markers": list(markers),
+        "root_parents": root_parents,
+        "meta": {key: value for key, value in data["meta"].items() if key != "markers"},
+    }
+
+
+def expand_flat_tree(data: dict) -> dict:
+    """Nested tree like `build_dict_tree` from a `flatten_dict_tree` payload"""
+    nodes = data["nodes"]
+    types = data["types"]
+    paths = data["paths"]
+    markers = data["markers"]
+    root_parents = iter(data["root_parents"])
+
+    tree: dict[Any, Any] = {}
+    # node dicts by id, to look up parents
+    node_dicts: list[dict[Any, Any]] = []
+    for (
+        name,
+        nodeid,
+        parent_index,
+        type_index,
+        path_index,
+        lineno,
+        marker_indices,
+    ) in zip(
+        nodes["name"],
+        nodes["nodeid"],
+        nodes["parent"],
+        nodes["type"],
+        nodes["path"],
+        nodes["lineno"],
+        nodes["markers"],
+    ):
+        if parent_index is None:
+            parent = None
+            parent_name, parent_type = next(root_parents)
+        else:
+            parent = node_dicts[parent_index]
+            parent_name, parent_type = parent["name"], parent["type"]
+
+        node = {
+            "name": name,
+            "nodeid": nodeid if nodeid is not None else f"{parent['nodeid']}::{name}",
+            "markers": [markers[marker_index] for marker_index in marker_indices],
+            "path": paths[path_index],
+            "lineno": lineno,
+            "parent_name": parent_name,
+            "parent_type": parent_type,
+            "type": types[type_index],
+            "favourite": False,
+            "status": "",
+            "children": [],
+        }
+        node_dicts.append(node)
+        if parent is None:
+            tree[name] = node
+        else:
+            parent["children"].append(node)
+
+    return {"tree": tree, "meta": {**data["meta"], "markers": markers}}
+
+
+def get_coverage_data(coverage_file=".coverage", workers: int | None = None):
+    report_dict = {}
+    for coverage_part in iter_coverage_data(
+        coverage_file=coverage_file, workers=workers
+    ):
+        report_dict.update(coverage_part)
+    return dict(sorted(report_dict.items()))
+
+
+def iter_coverage_data(
+    coverage_file=".coverage", workers: int | None = None
+) -> Iterator[dict]:
+    """Coverage of the measured files in parts, analysed by a pool of processes,
+    yields every part as soon as it is done, in the order they finish"""
+    import coverage
+
+    data = coverage.CoverageData(basename=coverage_file)
+    data.read()
+    all_files = sorted(data.measured_files())
+    chunks = [
+        all_files[start : start + COVERAGE_CHUNK_SIZE]
+        for start in range(0, len(all_files), COVERAGE_CHUNK_SIZE)
+    ]
+    workers = workers or os.cpu_count() or 1
+    if len(chunks) <= 1 or workers == 1:
+        for chunk in chunks or [[]]:
+            yield analyze_coverage_files(coverage_file, chunk)
+        return
+
+    # spawned, forking would copy the locks of the event sender thread
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(analyze_coverage_files, coverage_file, chunk)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def analyze_coverage_files(coverage_file: str, file_paths: list[str]) -> dict:
     import coverage
 
     cov = coverage.Coverage(data_file=coverage_file)
@@ -203,8 +489,7 @@ def get_coverage_data(coverage_file=".coverage"):
 
     report_dict = {}
 
-    all_files = cov.get_data().measured_files()
-    for file_path in sorted(all_files):
+    for file_path in file_paths:
         file_data = cov.analysis2(file_path)
         # analysis2 returns: (0:filename, 1:statements, 2:excluded, 3:missing, 4:partial)
         total_statements = len(file_data[1])  # All statements
@@ -245,6 +530,21 @@ def test_node_to_dict(node: Node) -> dict[str, Any]:
     }
 
 
+def test_report_to_dict(report: TestReport) -> dict[str, Any]:
+    path, lineno, otherloc = report.location
+    return {
+        "nodeid": report.nodeid,
+        "when": report.when,
+        "caplog": report.caplog,
+        "longreprtext": remove_ansi_escapes(report.longreprtext),
+        "duration": report.duration,
+        "outcome": report.outcome,
+        "path": path,
+        "lineno": lineno,
+        "otherloc": otherloc,
+    }
+
+
 def build_bar(percentage: float) -> str:
     SEGS = ["▉", "▊", "▋", "▌", "▍", "▎", "▏", ""]
     tens = int(percentage // 10)
@@ -15,7 +15,7 @@ from ayu.utils import EventType, build_bar
 class CoverageExplorer(Vertical):
     app: "AyuApp"
 
-    coverage_dict: reactive[dict] = reactive({})
+    coverage_dict: reactive[dict] = reactive(dict)
     selected_file: reactive[str] = reactive("")
     selected_line: reactive[list] = reactive([])
 
@@ -47,7 +47,15 @@ class CoverageExplorer(Vertical):
         return super().watch_disabled(disabled)
 
     def update_coverage_dict(self, msg):
-        self.coverage_dict = msg["coverage_dict"]
+        if msg.get("is_first_part", True):
+            self.coverage_dict = msg["coverage_dict"]
+        else:
+            # the parts arrive in the order they are analysed, the tables share
+            # the dict, it is kept sorted by path and only the new rows are added
+            merged_dict = {**self.coverage_dict, **msg["coverage_dict"]}
+            self.coverage_dict.clear()
+            self.coverage_dict.update(sorted(merged_dict.items()))
+            self.query_one(CoverageTable).add_coverage_rows(msg["coverage_dict"])
 
     @on(DataTable.RowHighlighted, "#table_coverage")
     def update_selected_file(self, event: DataTable.RowHighlighted):
@@ -91,7 +99,7 @@ class CoverageTable(DataTable):
         self.border_title = "Coverage Report"
 
         for column in self.COLUMNS:
-            self.add_column(label=column, width=None if column else 10)
+            self.add_column(label=column, width=None if column else 10, key=column)
 
     # Go to first row, when navigating down on last row
     def action_cursor_down(self) -> None:
@@ -113,8 +121,13 @@ class CoverageTable(DataTable):
 
         current_line = self.cursor_row or 0
         self.clear()
+        self.add_coverage_rows(self.coverage_dict)
+
+        # go to last known cursor position
+        self.move_cursor(row=current_line)
 
-        for module_name, module_dict in self.coverage_dict.items():
+    def add_coverage_rows(self, coverage_dict: dict):
+        for module_name, module_dict in coverage_dict.items():
             self.add_row(
                 module_name,
                 module_dict["n_statements"],
@@ -123,9 +136,8 @@ class CoverageTable(DataTable):
                 build_bar(module_dict["percent_covered"]),
                 key=module_name,
             )
-
-        # go to last known cursor position
-        self.move_cursor(row=current_line)
+        # rows of later coverage parts are moved to their path
+        self.sort("Name")
 
     @on(DataTable.RowSelected)
     def test(self, event: DataTable.RowSelected): ...
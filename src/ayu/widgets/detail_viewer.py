@@ -1,18 +1,31 @@
+import asyncio
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 if TYPE_CHECKING:
     from ayu.app import AyuApp
 
-from textual import on
+from textual import on, work
 from textual.reactive import reactive
 from textual.widgets import TextArea
 from textual_slidecontainer import SlideContainer
 from rich.text import Text
 
-from ayu.utils import EventType, get_preview_test
+from ayu.constants import REPORT_PAGE_SIZE
+from ayu.utils import (
+    EventType,
+    ReportLineType,
+    classify_report_lines,
+    get_preview_test,
+)
 from ayu.widgets.helper_widgets import ToggleRule
 
+REPORT_LINE_STYLES = {
+    ReportLineType.FAILED_LINE: "bold red",
+    ReportLineType.ERROR: "red",
+    ReportLineType.LOCATION: "italic red",
+}
+
 
 class DetailView(SlideContainer):
     file_path_to_preview: reactive[Path | None] = reactive(None, init=False)
@@ -35,21 +48,29 @@ class DetailView(SlideContainer):
         yield ToggleRule(target_widget_id="textarea_test_result_details")
         yield TestResultDetails(id="textarea_test_result_details")
 
+    def show_test(self, file_path: Path, start_line_no: int):
+        """Update file and line together, to render the preview once,
+        also if only one of them changed"""
+        self.set_reactive(DetailView.file_path_to_preview, file_path)
+        self.set_reactive(DetailView.test_start_line_no, start_line_no)
+        self.watch_file_path_to_preview()
+        self.watch_test_start_line_no()
+
     def watch_file_path_to_preview(self):
         self.border_title = self.file_path_to_preview.as_posix()
 
     def watch_test_start_line_no(self):
+        # queried by type, the id is only set once the preview is mounted
+        code_preview = self.query_one(CodePreview)
         if self.test_start_line_no == -1:
-            self.query_one("#textarea_preview").text = "Please select a test"
+            code_preview.text = "Please select a test"
         else:
             content = get_preview_test(
                 file_path=self.file_path_to_preview,
                 start_line_no=self.test_start_line_no,
             )
-            self.query_one(
-                "#textarea_preview", TextArea
-            ).line_number_start = self.test_start_line_no
-            self.query_one("#textarea_preview", TextArea).text = content
+            code_preview.line_number_start = self.test_start_line_no
+            code_preview.text = content
 
     @on(ToggleRule.Toggled)
     def toggle_code_result_visibility(self, event: ToggleRule.Toggled):
@@ -68,7 +89,17 @@ class CodePreview(TextArea):
 class TestResultDetails(TextArea):
     app: "AyuApp"
     selected_node_id: reactive[str] = reactive("")
-    report_data: reactive[dict] = reactive({})
+    report_data: reactive[dict] = reactive(dict)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # all lines of the selected report, only the last page is loaded at first
+        self.report_lines: list[str] = []
+        self.first_loaded_line = 0
+        # types of the loaded lines, classified once they are rendered
+        self.line_types: list[ReportLineType] = []
+        self.line_classifier: Iterator[ReportLineType] = iter(())
+        self.loading_page = False
 
     def on_mount(self):
         # self.language = "python"
@@ -80,26 +111,81 @@ class TestResultDetails(TextArea):
             handler=lambda msg: self.update_report_data(msg),
         )
 
-    def update_report_data(self, data: dict):
-        if data["report"]:
-            self.report_data = data["report"]
+    def update_report_data(self, data: list[dict]):
+        """Merge the report summaries of the tests, which finished since the last event"""
+        for report in data:
+            self.report_data[report["nodeid"]] = report
+        if any(report["nodeid"] == self.selected_node_id for report in data):
+            self.show_report(nodeid=self.selected_node_id)
 
     def watch_selected_node_id(self):
-        if self.report_data.get(self.selected_node_id):
-            text = self.report_data[self.selected_node_id]["longreprtext"]
-            self.text = self.make_error_part_red(text)
+        self.show_report(nodeid=self.selected_node_id)
+
+    @work(exclusive=True, group="Report", description="Loads the selected report")
+    async def show_report(self, nodeid: str):
+        # only the summaries are kept, the output is read from the report store
+        report = None
+        if nodeid in self.report_data:
+            report = await asyncio.to_thread(self.app.report_store.get, nodeid)
+
+        if report:
+            self.report_lines = report["longreprtext"].splitlines()
+            self.load_report_page(
+                first_line=max(0, len(self.report_lines) - REPORT_PAGE_SIZE)
+            )
 
-            duration = self.report_data[self.selected_node_id]["duration"]
+            duration = report["duration"]
             self.parent.border_subtitle = Text.from_markup(
                 f":hourglass_not_done: {duration:.5f}s"
             )
 
-            self.scroll_end(animate=False)
+            self.scroll_end(animate=False, immediate=True)
         else:
-            self.text = ""
+            self.report_lines = []
+            self.load_report_page(first_line=0)
             self.parent.border_subtitle = ""
 
-    def make_error_part_red(self, text: str) -> str:
+    def load_report_page(self, first_line: int):
+        """Load the report from the given line until the end, replaces the text"""
+        self.first_loaded_line = first_line
+        loaded_lines = self.report_lines[first_line:]
+        self.line_types = []
+        self.line_classifier = classify_report_lines(loaded_lines)
+        self.loading_page = True
+        self.text = "\n".join(loaded_lines)
+        self.loading_page = False
+
+    def load_previous_page(self):
+        """Prepend the previous page and keep the shown lines in place"""
+        first_line = max(0, self.first_loaded_line - REPORT_PAGE_SIZE)
+        added_lines = self.report_lines[first_line : self.first_loaded_line]
+        self.first_loaded_line = first_line
+        # only the new page is inserted and classified, the loaded lines stay
+        self.line_types[:0] = classify_report_lines(added_lines)
+        self.loading_page = True
+        self.insert("\n".join(added_lines) + "\n", location=(0, 0))
+        # the report can't be edited, no need to keep the pages for undo
+        self.history.clear()
+        self.loading_page = False
+        offset = self.wrapped_document.location_to_offset((len(added_lines), 0))
+        self.scroll_to(y=offset.y, animate=False, immediate=True)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if new_value == 0 and self.first_loaded_line > 0 and not self.loading_page:
+            self.load_previous_page()
+
+    def get_line(self, line_index: int) -> Text:
+        return self.make_error_part_red(
+            line=super().get_line(line_index), line_index=line_index
+        )
+
+    def make_error_part_red(self, line: Text, line_index: int) -> Text:
         """highlight lines which caused the error"""
-        # TODO
-        return text
+        # lines are only classified up to the rendered one
+        while len(self.line_types) <= line_index:
+            self.line_types.append(next(self.line_classifier, ReportLineType.TEXT))
+        style = REPORT_LINE_STYLES.get(self.line_types[line_index])
+        if style:
+            line.stylize(style)
+        return line
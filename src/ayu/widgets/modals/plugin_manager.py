@@ -130,7 +130,7 @@ class ModalPlugin(ModalScreen):
 
             # Update option dict with new plugins
             command = build_command(plugins=[new_plugin], pytest_options=["--help"])
-            await run_plugin_collection(command=command)
+            await run_plugin_collection(command=command, env=self.app.subprocess_env)
             self.query_one(Input).clear()
             # self.mutate_reactive(ModalPlugin.plugin_option_dict)
 
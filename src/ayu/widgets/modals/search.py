@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING, Literal
 
 if TYPE_CHECKING:
     from ayu.app import AyuApp
+from textual import work
 from textual.message import Message
 from textual.events import Key
 from textual.reactive import reactive
@@ -18,6 +19,8 @@ from ayu.utils import NodeType
 
 class SearchInput(Input):
     filtered_node_types: reactive[list] = reactive([])
+    # search in the source and the failure output instead of the nodeids
+    full_text: reactive[bool] = reactive(False)
 
     def on_key(self, event: Key):
         if event.key == "backspace":
@@ -26,8 +29,21 @@ class SearchInput(Input):
                 self.mutate_reactive(SearchInput.filtered_node_types)
                 # Fix error showing latest autocompletes if backspacing from 2 elements
 
+    def watch_full_text(self):
+        self.watch_filtered_node_types()
+
     def watch_filtered_node_types(self):
-        if self.filtered_node_types:
+        if self.full_text:
+            self.placeholder = "Search in test source, docstrings and failure output"
+            self.border_subtitle = Content.from_markup(
+                "[white]full text search[/]"
+                + (
+                    f" [$success-darken-2]{', '.join(self.filtered_node_types)}[/]"
+                    if self.filtered_node_types
+                    else ""
+                )
+            )
+        elif self.filtered_node_types:
             hint_substring = (
                 f"(press `backspace` to remove {self.filtered_node_types[-1]})"
             )
@@ -42,6 +58,7 @@ class SearchInput(Input):
                 "Type to search for test or press ':' to filter for different NodeTypes"
             )
             self.styles.border_bottom = None
+            self.border_subtitle = None
 
 
 class SearchAutoComplete(AutoComplete):
@@ -49,7 +66,7 @@ class SearchAutoComplete(AutoComplete):
 
     def get_candidates(self, target_state: TargetState) -> list[DropdownItem]:
         # Filter candidates based on target_state.text
-        nodes = self.app.query_one("#testtree").test_nodes
+        store = self.app.test_store
         prefix_bg = "$surface-lighten-3"
         if target_state.text.startswith(":"):
             return [
@@ -61,18 +78,50 @@ class SearchAutoComplete(AutoComplete):
                 for node_type in NodeType
                 if node_type not in self.target.filtered_node_types
             ]
+        if self.target.full_text:
+            # the sources are indexed in a worker thread, the query runs afterwards
+            if self.screen.indexing_sources:
+                return []
+            node_ids = [
+                store.ids[nodeid]
+                for nodeid in self.app.text_index.search(
+                    query=self.get_search_string(target_state)
+                )
+            ]
+            if self.target.filtered_node_types:
+                node_ids = [
+                    node_id
+                    for node_id in node_ids
+                    if store.node_data[node_id]["type"]
+                    in self.target.filtered_node_types
+                ]
+        else:
+            # only the best matches are matched fuzzy and highlighted
+            node_ids = self.app.search_index.search(
+                query=self.get_search_string(target_state),
+                node_types=self.target.filtered_node_types,
+            )
         return [
             DropdownItem(
-                main=f"{node.data['nodeid']}",
+                main=f"{store.nodeids[node_id]}",
                 prefix=Content.from_markup(
-                    f"[on {prefix_bg}] {node.data['type']}[/][{prefix_bg}]\ue0b4[/] {'⭐' if node.data['favourite'] else ''}"
+                    f"[on {prefix_bg}] {store.node_data[node_id]['type']}[/][{prefix_bg}]\ue0b4[/] {'⭐' if store.favourite[node_id] else ''}"
                 ),
             )
-            for node in nodes[1:]
-            if node.data["type"] in (self.target.filtered_node_types or NodeType)
-            # if node.data['type'] in
+            for node_id in node_ids
         ]
 
+    def get_matches(
+        self,
+        target_state: TargetState,
+        candidates: list[DropdownItem],
+        search_string: str,
+    ) -> list[DropdownItem]:
+        # full text matches are ranked already and won't match the nodeid
+        if self.target.full_text and not target_state.text.startswith(":"):
+            return candidates
+        return super().get_matches(target_state, candidates, search_string)
+
     def get_search_string(self, target_state: TargetState) -> str:
         # get only part after certain filter
         if target_state.text.startswith(":"):
@@ -104,6 +153,7 @@ class SearchAutoComplete(AutoComplete):
 
 class ModalSearch(ModalScreen):
     app: "AyuApp"
+    indexing_sources: bool = False
 
     BINDINGS = [
         Binding("escape", "app.pop_screen", "Close", show=True),
@@ -112,6 +162,7 @@ class ModalSearch(ModalScreen):
         ),
         Binding("ctrl+k", "navigate_highlight('up')", "up", priority=True, show=True),
         Binding("ctrl+f", "mark_as_fav", "⭐ Mark", priority=True, show=True),
+        Binding("ctrl+t", "toggle_full_text", "Full Text", priority=True, show=True),
     ]
 
     class Marked(Message):
@@ -159,6 +210,34 @@ class ModalSearch(ModalScreen):
         autocomplete.option_list.highlighted = highlighted
         autocomplete.option_list.scroll_y = scroll_y
 
+    def action_toggle_full_text(self):
+        search_input = self.query_one(SearchInput)
+        search_input.full_text = not search_input.full_text
+        if search_input.full_text:
+            self.indexing_sources = True
+            self.index_sources()
+        else:
+            self.rebuild_options()
+
+    @work(thread=True, exclusive=True, description="Index Test Sources")
+    def index_sources(self):
+        # only files changed since the last search are read again
+        try:
+            self.app.text_index.update_sources()
+        finally:
+            self.indexing_sources = False
+        self.app.call_from_thread(self.rebuild_options)
+
+    def rebuild_options(self):
+        # the search could be closed while the sources were indexed
+        if not self.is_attached:
+            return
+        autocomplete = self.query_one(SearchAutoComplete)
+        target_state = autocomplete._get_target_state()
+        autocomplete._rebuild_options(
+            target_state, autocomplete.get_search_string(target_state)
+        )
+
     def action_mark_as_fav(self):
         option_list = self.query_one(SearchAutoComplete).option_list
         # displayed = self.query_one(SearchAutoComplete).display
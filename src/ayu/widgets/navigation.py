@@ -1,8 +1,9 @@
 from typing import Any, TYPE_CHECKING
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
 
 if TYPE_CHECKING:
     from ayu.app import AyuApp
-from textual import work
 from textual.reactive import reactive
 from rich.style import Style
 from textual.binding import Binding
@@ -17,9 +18,28 @@ from ayu.utils import (
     TestOutcome,
     get_nice_tooltip,
 )
-from ayu.constants import OUTCOME_SYMBOLS
+from ayu.constants import LAZY_TREE_THRESHOLD, OUTCOME_SYMBOLS
+from ayu.classes.test_store import TestStore
 
 TOGGLE_STYLE = Style.from_meta({"toggle": True})
+FILTERED_OUTCOMES = {
+    "show_passed": TestOutcome.PASSED,
+    "show_failed": TestOutcome.FAILED,
+    "show_skipped": TestOutcome.SKIPPED,
+}
+
+
+@dataclass
+class NodeCounters:
+    """Number of visible tests below a node, in total, per status and marked ones"""
+
+    tests: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    marked: int = 0
+
+    @property
+    def with_status(self) -> int:
+        return self.tests - self.statuses[""]
 
 
 class TestTree(Tree):
@@ -50,6 +70,19 @@ class TestTree(Tree):
         },
     )
 
+    def __init__(self, *args, store: TestStore | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # state of all nodes, including the ones hidden by the filter
+        self.store = store if store is not None else TestStore()
+        # nodeid -> node of all nodes in the tree
+        self.node_index: dict[str, TreeNode] = {}
+        # nodeids of nodes, whose children were added to the tree
+        self.materialized: set[str] = set()
+        # nodes highlighted by a hovered marker
+        self.highlighted_nodes: list[TreeNode] = []
+        # store id -> test counters of all parents, -1 holds the counters of all tests
+        self.node_counters: defaultdict[int, NodeCounters] = defaultdict(NodeCounters)
+
     def on_mount(self):
         self.app.dispatcher.register_handler(
             event_type=EventType.SCHEDULED,
@@ -64,7 +97,7 @@ class TestTree(Tree):
 
     def watch_filter(self):
         if self.filtered_data_test_tree:
-            self.build_tree()
+            self.apply_filter()
 
     def watch_filtered_counter_total_tests(self):
         self.update_border_title()
@@ -91,133 +124,365 @@ class TestTree(Tree):
 
     def build_tree(self):
         self.clear()
-        self.reset_status_counters()
-        self.counter_marked = 0
+        self.reset_store()
+        self.index_data(child_list=list(self.filtered_data_test_tree.values()))
         self.update_tree(tree_data=self.filtered_data_test_tree)
+        self.update_counters()
+
+    def clear(self):
+        self.node_index.clear()
+        self.materialized.clear()
+        self.highlighted_nodes = []
+        return super().clear()
+
+    @property
+    def is_lazy(self) -> bool:
+        """Large trees only add the children of a node, once it is expanded"""
+        return self.store.test_count > LAZY_TREE_THRESHOLD
+
+    def reset_store(self):
+        self.store.clear()
+        self.node_counters = defaultdict(NodeCounters)
+
+    def index_data(self, child_list: list[dict[Any, Any]], parent_id: int = -1):
+        for child in child_list:
+            node_id = self.store.add(node_data=child, parent_id=parent_id)
+            if child["children"]:
+                self.index_data(child_list=child["children"], parent_id=node_id)
+            elif self.is_test_visible(node_id=node_id):
+                self.show_test(node_id=node_id)
+
+    def get_counters(self, node_id: int):
+        """Counters of all parents of a node and the counters of all tests"""
+        for parent_id in self.store.get_parent_ids(node_id=node_id):
+            yield self.node_counters[parent_id]
+        yield self.node_counters[-1]
+
+    def count_test(self, node_id: int, change: int):
+        status = self.store.get_status(node_id=node_id)
+        is_fav = self.store.favourite[node_id]
+        for parent_id in self.store.get_parent_ids(node_id=node_id):
+            counters = self.node_counters[parent_id]
+            counters.tests += change
+            counters.statuses[status] += change
+            counters.marked += change if is_fav else 0
+            self.store.visible[parent_id] = counters.tests > 0
+        counters = self.node_counters[-1]
+        counters.tests += change
+        counters.statuses[status] += change
+        counters.marked += change if is_fav else 0
+
+    def show_test(self, node_id: int):
+        self.store.set_visible(node_id=node_id, is_visible=True)
+        self.count_test(node_id=node_id, change=1)
+
+    def hide_test(self, node_id: int):
+        self.store.set_visible(node_id=node_id, is_visible=False)
+        self.count_test(node_id=node_id, change=-1)
+
+    def set_test_status(self, node_id: int, status: str):
+        """Change the status of a test and update the counters of its parents"""
+        old_status = self.store.set_status(node_id=node_id, status=status)
+        if self.store.visible[node_id]:
+            for counters in self.get_counters(node_id=node_id):
+                counters.statuses[old_status] -= 1
+                counters.statuses[status] += 1
+
+    def set_favourite(self, node_id: int, is_fav: bool):
+        if self.store.favourite[node_id] == is_fav:
+            return
+        self.store.set_favourite(node_id=node_id, is_fav=is_fav)
+        if self.store.visible[node_id] and self.store.is_test[node_id]:
+            for counters in self.get_counters(node_id=node_id):
+                counters.marked += 1 if is_fav else -1
+
+    def update_counters(self):
+        """Set the counters from the counts of all tests, rendering the border title once"""
+        counters = self.node_counters[-1]
+        self.set_reactive(
+            TestTree.counter_queued, counters.statuses[TestOutcome.QUEUED]
+        )
+        self.set_reactive(
+            TestTree.counter_passed, counters.statuses[TestOutcome.PASSED]
+        )
+        self.set_reactive(
+            TestTree.counter_failed, counters.statuses[TestOutcome.FAILED]
+        )
+        self.set_reactive(
+            TestTree.counter_skipped, counters.statuses[TestOutcome.SKIPPED]
+        )
+        self.set_reactive(TestTree.filtered_counter_total_tests, counters.tests)
+        self.update_border_title()
+        # refreshes the bindings, if marked tests changed
+        self.counter_marked = counters.marked
 
     def filter_tests(self, tests): ...
 
     def update_tree(self, *, tree_data: dict[Any, Any]):
         parent = self.root
 
-        def add_children(child_list: list[dict[Any, Any]], parent_node: TreeNode):
-            for child in child_list:
-                if child["children"]:
-                    if not self.filter["show_favourites"] and child["favourite"]:
-                        continue
-                    new_node = parent_node.add(
-                        label=child["name"], data=child, expand=True
-                    )
-                    add_children(child_list=child["children"], parent_node=new_node)
-
-                    # if all children were filtered out, remove this node
-                    if not new_node.children:
-                        new_node.remove()
-                else:
-                    # TODO Make this cleaner, also check for MODULES to be not displayed
-                    if not self.filter["show_favourites"] and child["favourite"]:
-                        self.filtered_counter_total_tests -= 1
-                        continue
-                    if not self.filter["show_passed"] and (
-                        child["status"] == TestOutcome.PASSED
-                    ):
-                        self.filtered_counter_total_tests -= 1
-                        continue
-                    if not self.filter["show_skipped"] and (
-                        child["status"] == TestOutcome.SKIPPED
-                    ):
-                        self.filtered_counter_total_tests -= 1
-                        continue
-                    if not self.filter["show_failed"] and (
-                        child["status"] == TestOutcome.FAILED
-                    ):
-                        self.filtered_counter_total_tests -= 1
-                        continue
-
-                    parent_node.add_leaf(label=child["name"], data=child)
-
-                    if child["favourite"]:
-                        self.counter_marked += 1
-
-                    match child["status"]:
-                        case TestOutcome.PASSED:
-                            self.counter_passed += 1
-                        case TestOutcome.SKIPPED:
-                            self.counter_skipped += 1
-                        case TestOutcome.FAILED:
-                            self.counter_failed += 1
-
         for key, value in tree_data.items():
             if isinstance(value, dict) and "children" in value and value["children"]:
                 node: TreeNode = parent.add(key, data=value)
+                self.node_index[value["nodeid"]] = node
                 node.expand()
-                add_children(value["children"], node)
+                self.add_node_children(node=node)
             else:
                 parent.add_leaf(key, data=key)
 
         # set initial cursor line
         self.cursor_line: int = 0 if self.cursor_line < 0 else self.cursor_line
 
-        # TODO remove empty nodes after filtering
-        # for node in self._tree_nodes.values():
-        #     self.log(f'{node}')
-        #     if node:
-        #         if node.children:
-        #             continue
-        #         else:
-        #             node.remove()
-
-    def update_test_outcome(self, test_result: dict):
-        for node in self._tree_nodes.values():
-            if node.data and (node.data["nodeid"] == test_result["nodeid"]):
-                outcome = test_result["outcome"]
-                node.data["status"] = outcome
-                node.refresh()
-                node.parent.refresh()
-                self.counter_queued -= 1
-                match outcome:
-                    case TestOutcome.PASSED:
-                        self.counter_passed += 1
-                    case TestOutcome.FAILED:
-                        self.counter_failed += 1
-                    case TestOutcome.SKIPPED:
-                        self.counter_skipped += 1
-
-                self.update_collapse_state_on_test_run(node=node)
-                self.update_filtered_data_test_tree(
-                    nodeid=node.data["nodeid"], new_status=outcome
+    def add_children(self, child_list: list[dict[Any, Any]], parent_node: TreeNode):
+        for child in child_list:
+            # parents without visible tests are not shown
+            if not self.store.visible[self.store.ids[child["nodeid"]]]:
+                continue
+            if child["children"]:
+                new_node = parent_node.add(
+                    label=child["name"], data=child, expand=not self.is_lazy
+                )
+                self.node_index[child["nodeid"]] = new_node
+                if not self.is_lazy:
+                    self.add_node_children(node=new_node)
+            else:
+                self.node_index[child["nodeid"]] = parent_node.add_leaf(
+                    label=child["name"], data=child
                 )
 
-    def update_collapse_state_on_test_run(self, node: TreeNode):
-        def all_child_tests_passed(parent: TreeNode):
-            return all(
-                [
-                    all_child_tests_passed(parent=child)
-                    if child.data["type"] == NodeType.CLASS
-                    else child.data["status"] in [TestOutcome.PASSED]
-                    for child in parent.children
-                ]
+    def add_node_children(self, node: TreeNode):
+        self.materialized.add(node.data["nodeid"])
+        self.add_children(child_list=node.data["children"], parent_node=node)
+
+    def on_tree_node_expanded(self, event: Tree.NodeExpanded):
+        # children of lazy trees are added on the first expand
+        if event.node.data and (event.node.data["nodeid"] not in self.materialized):
+            self.add_node_children(node=event.node)
+
+    def reveal_node(self, nodeid: str) -> TreeNode | None:
+        """Node of a visible test or parent, collapsed parents are expanded"""
+        if nodeid not in self.store:
+            return None
+        parent_ids = list(self.store.get_parent_ids(node_id=self.store.ids[nodeid]))
+        for parent_id in reversed(parent_ids):
+            parent_nodeid = self.store.nodeids[parent_id]
+            parent_node = self.node_index.get(parent_nodeid)
+            if parent_node is None:
+                return None
+            if parent_nodeid not in self.materialized:
+                self.add_node_children(node=parent_node)
+            parent_node.expand()
+        return self.node_index.get(nodeid)
+
+    def is_test_visible(self, node_id: int) -> bool:
+        if not self.filter["show_favourites"] and self.store.favourite[node_id]:
+            return False
+        status = self.store.get_status(node_id=node_id)
+        for filter_key, outcome in FILTERED_OUTCOMES.items():
+            if not self.filter[filter_key] and status == outcome:
+                return False
+        return True
+
+    def apply_filter(self):
+        """Only add or remove the tests, whose visibility changed with the filter"""
+        hidden_bits = self.store.status_bits(
+            statuses=[
+                outcome
+                for filter_key, outcome in FILTERED_OUTCOMES.items()
+                if not self.filter[filter_key]
+            ]
+        )
+        if not self.filter["show_favourites"]:
+            hidden_bits |= self.store.bits(self.store.favourite)
+        test_bits = self.store.bits(self.store.is_test)
+        visible_bits = self.store.bits(self.store.visible) & test_bits
+        changed_bits = (test_bits & ~hidden_bits) ^ visible_bits
+
+        nodeids_to_show = set()
+        for node_id in self.store.select(changed_bits):
+            nodeid = self.store.nodeids[node_id]
+            if self.store.visible[node_id]:
+                self.hide_test(node_id=node_id)
+                if nodeid in self.node_index:
+                    self.remove_hidden_node(node=self.node_index[nodeid])
+            else:
+                self.show_test(node_id=node_id)
+                nodeids_to_show.add(nodeid)
+        self.add_test_nodes(nodeids=nodeids_to_show)
+        self.update_counters()
+
+    def add_test_nodes(self, nodeids: set[str]):
+        """Add the nodes of tests which became visible, missing parents are added too"""
+        nodeids_by_parent = defaultdict(set)
+        for nodeid in nodeids:
+            # find the lowest parent, which is part of the tree
+            child_id = self.store.ids[nodeid]
+            parent_id = self.store.parents[child_id]
+            while (
+                parent_id != -1 and self.store.nodeids[parent_id] not in self.node_index
+            ):
+                child_id = parent_id
+                parent_id = self.store.parents[parent_id]
+            # collapsed parents of lazy trees add their children once expanded
+            if parent_id == -1 or self.store.nodeids[parent_id] in self.materialized:
+                nodeids_by_parent[parent_id].add(self.store.nodeids[child_id])
+
+        for parent_id, child_nodeids in nodeids_by_parent.items():
+            self.add_nodes_in_order(parent_id=parent_id, nodeids=child_nodeids)
+
+    def remove_hidden_node(self, node: TreeNode):
+        """Remove a hidden test and all parents, which have no visible tests left"""
+        parent = node.parent
+        self.remove_node(node=node)
+        while (
+            parent is not self.root
+            and not self.store.visible[self.store.ids[parent.data["nodeid"]]]
+        ):
+            grandparent = parent.parent
+            self.remove_node(node=parent)
+            parent = grandparent
+
+    def remove_node(self, node: TreeNode):
+        def unindex(node: TreeNode):
+            self.node_index.pop(node.data["nodeid"], None)
+            self.materialized.discard(node.data["nodeid"])
+            for child in node.children:
+                unindex(node=child)
+
+        unindex(node=node)
+        node.remove()
+
+    def add_nodes_in_order(self, parent_id: int, nodeids: set[str]):
+        """Add nodes at the position of their data, between the visible siblings"""
+        if parent_id == -1:
+            parent_node = self.root
+            siblings = list(self.filtered_data_test_tree.values())
+        else:
+            parent_node = self.node_index[self.store.nodeids[parent_id]]
+            siblings = self.store.node_data[parent_id]["children"]
+        index = 0
+        for sibling in siblings:
+            if sibling["nodeid"] in nodeids:
+                if sibling["children"]:
+                    new_node = parent_node.add(
+                        label=sibling["name"],
+                        data=sibling,
+                        before=index,
+                        expand=not self.is_lazy,
+                    )
+                    self.node_index[sibling["nodeid"]] = new_node
+                    if not self.is_lazy:
+                        self.add_node_children(node=new_node)
+                else:
+                    self.node_index[sibling["nodeid"]] = parent_node.add_leaf(
+                        label=sibling["name"], data=sibling, before=index
+                    )
+                index += 1
+            elif sibling["nodeid"] in self.node_index:
+                index += 1
+
+    def reset_tree(self, tree_data: dict[Any, Any]):
+        """Start with an empty tree, which is filled part by part with `merge_tree`"""
+        self.set_reactive(TestTree.filtered_data_test_tree, tree_data)
+        self.clear()
+        self.reset_store()
+        self.update_counters()
+
+    def merge_tree(self, *, tree_data: dict[Any, Any]):
+        """Merge a part of the collection into the tree data,
+        only nodes which are not part of the tree yet are added"""
+
+        def merge_children(
+            child_list: list[dict[Any, Any]],
+            data_parent: dict[Any, Any],
+        ):
+            new_children = []
+            for child in child_list:
+                existing_id = self.store.ids.get(child["nodeid"])
+                if existing_id is None:
+                    data_parent["children"].append(child)
+                    new_children.append(child)
+                else:
+                    merge_children(
+                        child_list=child["children"],
+                        data_parent=self.store.node_data[existing_id],
+                    )
+            self.index_data(
+                child_list=new_children,
+                parent_id=self.store.ids[data_parent["nodeid"]],
             )
+            # nodes hidden by the filter or collapsed only get their data merged
+            parent_node = self.node_index.get(data_parent["nodeid"])
+            if parent_node is not None and data_parent["nodeid"] in self.materialized:
+                self.add_children(child_list=new_children, parent_node=parent_node)
+
+        for key, value in tree_data.items():
+            if key not in self.filtered_data_test_tree:
+                self.filtered_data_test_tree[key] = value
+                self.index_data(child_list=[value])
+                self.update_tree(tree_data={key: value})
+            else:
+                merge_children(
+                    child_list=value["children"],
+                    data_parent=self.filtered_data_test_tree[key],
+                )
+        self.update_counters()
+        self.cursor_line = 0 if self.cursor_line < 0 else self.cursor_line
+
+    def update_test_outcome(self, test_results: list[dict] | dict):
+        """Apply a batch of test outcomes, only shown nodes are refreshed"""
+        if isinstance(test_results, dict):
+            test_results = [test_results]
+
+        updated_nodes = []
+        collapsed_parents = {}
+        for test_result in test_results:
+            node_id = self.store.ids.get(test_result["nodeid"])
+            if node_id is None:
+                continue
+            self.set_test_status(node_id=node_id, status=test_result["outcome"])
+            if "duration" in test_result:
+                self.store.duration[node_id] = test_result["duration"]
+            node = self.node_index.get(test_result["nodeid"])
+            if node is not None:
+                node.refresh()
+                updated_nodes.append(node)
+            elif self.store.visible[node_id]:
+                # update the label of the collapsed parent
+                for parent_id in self.store.get_parent_ids(node_id=node_id):
+                    parent_node = self.node_index.get(self.store.nodeids[parent_id])
+                    if parent_node is not None:
+                        collapsed_parents[parent_id] = parent_node
+                        break
+        self.update_counters()
+
+        updated_parents = {}
+        for node in updated_nodes:
+            updated_parents.setdefault(node.parent.id, node)
+        for node in updated_parents.values():
+            node.parent.refresh()
+            self.update_collapse_state_on_test_run(node=node)
+        for parent_node in collapsed_parents.values():
+            parent_node.refresh()
 
+    def update_collapse_state_on_test_run(self, node: TreeNode):
         if node.parent.data["type"] == NodeType.CLASS:
             self.update_collapse_state_on_test_run(node=node.parent)
-        if all_child_tests_passed(parent=node.parent):
+        counters = self.node_counters[self.store.ids[node.parent.data["nodeid"]]]
+        if counters.statuses[TestOutcome.PASSED] == counters.tests:
             node.parent.collapse()
 
-    def reset_status_counters(self) -> None:
-        self.counter_queued = 0
-        self.counter_passed = 0
-        self.counter_skipped = 0
-        self.counter_failed = 0
-        self.filtered_counter_total_tests = self.app.counter_total_tests
-
     def mark_tests_as_running(self, nodeids: list[str]) -> None:
-        self.root.expand_all()
-        self.reset_status_counters()
-        for node in self._tree_nodes.values():
-            if node.data and (node.data["nodeid"] in nodeids):
-                node.data["status"] = TestOutcome.QUEUED
-                self.counter_queued += 1
+        # lazy trees would add all nodes
+        if not self.is_lazy:
+            self.root.expand_all()
+        for nodeid in nodeids:
+            if nodeid in self.store:
+                self.set_test_status(
+                    node_id=self.store.ids[nodeid], status=TestOutcome.QUEUED
+                )
+        self.update_counters()
+        self.refresh_lines()
 
     def on_tree_node_selected(self, event: Tree.NodeSelected):
         # self.notify(f"{','.join(event.node.data['markers'])}")
@@ -225,15 +490,17 @@ class TestTree(Tree):
         # Run Test
 
     def mark_test_as_fav_from_markers(self, marker: str):
-        for node in self._tree_nodes.values():
-            if node.data and marker in node.data["markers"]:
-                self.action_mark_test_as_fav(node=node)
+        for node_id in self.store.marker_index.get(marker, []):
+            self.mark_as_fav(node_id=node_id, is_fav=not self.store.favourite[node_id])
+        self.update_counters()
+        self.refresh_lines()
 
     def action_mark_test_as_fav_from_search(self, nodeid: str):
-        node_to_mark = self.get_node_by_nodeid(nodeid=nodeid)
-        self.action_mark_test_as_fav(node=node_to_mark)
+        node_id = self.store.ids[nodeid]
+        self.mark_as_fav(node_id=node_id, is_fav=not self.store.favourite[node_id])
+        self.update_counters()
+        self.refresh_lines()
 
-    @work(thread=True)
     def action_mark_test_as_fav(
         self, node: TreeNode | None = None, parent_val: bool | None = None
     ):
@@ -241,64 +508,29 @@ class TestTree(Tree):
         if node is None:
             node = self.cursor_node
 
+        node_id = self.store.ids[node.data["nodeid"]]
         if parent_val is None:
-            parent_val = not node.data["favourite"]
-
-        # mark all childs the same as parent
-        if node.children:
-            node.data["favourite"] = parent_val
-            node.refresh()
-            # self.update_filtered_data_test_tree(
-            #     nodeid=node.data["nodeid"],
-            #     is_fav=parent_val,
-            # )
-            for child in node.children:
-                self.action_mark_test_as_fav(node=child, parent_val=parent_val)
-        else:
-            if node.data["favourite"] != parent_val:
-                self.counter_marked += 1 if parent_val else -1
-            node.data["favourite"] = parent_val
-            node.refresh()
-            # self.update_filtered_data_test_tree(
-            #     nodeid=node.data["nodeid"],
-            #     is_fav=parent_val,
-            # )
-            # self.mutate_reactive(TestTree.filtered_data_test_tree)
+            parent_val = not self.store.favourite[node_id]
+
+        self.mark_as_fav(node_id=node_id, is_fav=parent_val)
+        self.update_counters()
+        self.refresh_lines()
+
+    def mark_as_fav(self, node_id: int, is_fav: bool):
+        """Mark a node with all its children, also collapsed or hidden ones,
+        the changed lines are repainted with `refresh_lines` afterwards"""
+
+        def mark_children(node_id: int):
+            self.set_favourite(node_id=node_id, is_fav=is_fav)
+            for child in self.store.node_data[node_id]["children"]:
+                mark_children(node_id=self.store.ids[child["nodeid"]])
+
+        mark_children(node_id=node_id)
 
         # Unfavourite all parents, if a single child not is not favourited
-        if not node.data["favourite"]:
-            parent_node = node.parent
-            while parent_node.data is not None:
-                parent_node.data["favourite"] = node.data["favourite"]
-                parent_node.refresh()
-                parent_node = parent_node.parent
-
-    def update_filtered_data_test_tree(
-        self,
-        nodeid: str,
-        is_fav: bool | None = None,
-        new_status: TestOutcome | None = None,
-    ):
-        def update_filtered_node(child_list: list):
-            for child in child_list:
-                if child["nodeid"] == nodeid:
-                    if is_fav is not None:
-                        child["favourite"] = is_fav
-                    if new_status:
-                        child["status"] = new_status
-                    return True
-                if child["children"]:
-                    update_filtered_node(child_list=child["children"])
-
-        for key, val in self.filtered_data_test_tree.items():
-            if val["nodeid"] == nodeid:
-                if is_fav is not None:
-                    val["favourite"] = is_fav
-                if new_status:
-                    val["status"] = new_status
-                return True
-            if val["children"]:
-                update_filtered_node(child_list=val["children"])
+        if not is_fav:
+            for parent_id in self.store.get_parent_ids(node_id=node_id):
+                self.store.set_favourite(node_id=parent_id, is_fav=False)
 
     def process_label(self, label: TextType) -> Text:
         """Subclassed to handle [/] sequences, e.g. in parametrized tests"""
@@ -309,7 +541,10 @@ class TestTree(Tree):
     def render_label(
         self, node: TreeNode[TreeDataType], base_style: Style, style: Style
     ) -> Text:
-        fav_substring = Text.from_markup("⭐ ") if node.data["favourite"] else Text()
+        node_id = self.store.ids[node.data["nodeid"]]
+        fav_substring = (
+            Text.from_markup("⭐ ") if self.store.favourite[node_id] else Text()
+        )
         escaped_name_substring = Text(node.data["name"], style)
         # Render Classes, Modules and Folders
         if node._allow_expand:
@@ -317,8 +552,10 @@ class TestTree(Tree):
                 self.ICON_NODE_EXPANDED if node.is_expanded else self.ICON_NODE,
                 base_style + TOGGLE_STYLE,
             )
-            amount_test_results = self.get_number_of_tests_queued_of_node(node=node)
-            amount_tests_passed = self.get_number_of_passed_tests_of_node(node=node)
+            amount_test_results = self.node_counters[node_id].with_status
+            amount_tests_passed = self.node_counters[node_id].statuses[
+                TestOutcome.PASSED
+            ]
             if (
                 node.data["type"] in [NodeType.CLASS, NodeType.MODULE]
                 and amount_test_results
@@ -342,8 +579,9 @@ class TestTree(Tree):
             return module_label
 
         # Render Test Labels
+        status = self.store.get_status(node_id=node_id)
         status_substring = Text.from_markup(
-            f" {OUTCOME_SYMBOLS[node.data['status']]}" if node.data["status"] else ""
+            f" {OUTCOME_SYMBOLS[status]}" if status else ""
         )
         test_label = Text.assemble(
             fav_substring, escaped_name_substring, status_substring
@@ -351,23 +589,12 @@ class TestTree(Tree):
         return test_label
 
     def get_number_of_tests_queued_of_node(self, node: TreeNode) -> int:
-        return len(
-            [
-                child
-                for child in node.children
-                if (child.data["type"] in [NodeType.FUNCTION, NodeType.COROUTINE])
-                if child.data["status"]
-            ]
-        )
+        return self.node_counters[self.store.ids[node.data["nodeid"]]].with_status
 
     def get_number_of_passed_tests_of_node(self, node: TreeNode) -> int:
-        return len(
-            [
-                child
-                for child in node.children
-                if child.data["status"] == TestOutcome.PASSED
-            ]
-        )
+        return self.node_counters[self.store.ids[node.data["nodeid"]]].statuses[
+            TestOutcome.PASSED
+        ]
 
     def on_mouse_move(self):
         return
@@ -376,13 +603,24 @@ class TestTree(Tree):
             self.tooltip = get_nice_tooltip(node_data=data)
 
     def highlight_marker_rows(self, marker: str):
-        for node in self._tree_nodes.values():
+        for node in self.highlighted_nodes:
             node._hover = False
-            if node.data and (marker in node.data["markers"]):
-                node._hover = True
-                last_true_line = node.line
-                self.refresh()
-        self.hover_line = last_true_line
+        self.highlighted_nodes = [
+            self.node_index[self.store.nodeids[node_id]]
+            for node_id in self.store.marker_index.get(marker, [])
+            if self.store.nodeids[node_id] in self.node_index
+        ]
+        for node in self.highlighted_nodes:
+            node._hover = True
+        if self.highlighted_nodes:
+            self.hover_line = self.highlighted_nodes[-1].line
+        self.refresh_lines()
+
+    def refresh_lines(self):
+        """Repaint all lines at once, instead of refreshing every changed node"""
+        # the tree updates are part of the line cache key
+        self._updates += 1
+        self.refresh()
 
     def update_border_title(self):
         symbol = "hourglass_not_done" if self.counter_queued > 0 else "hourglass_done"
@@ -399,38 +637,29 @@ class TestTree(Tree):
         )
 
     def get_node_by_nodeid(self, nodeid: str) -> TreeNode | None:
-        for node in self._tree_nodes.values():
-            if node.data and (node.data["nodeid"] == nodeid):
-                return node
-        return None
+        return self.node_index.get(nodeid)
 
     @property
     def marked_tests(self):
         # TODO based on self.filtered_data_test_tree,
         # to run tests accordingly when filter is active
-        marked_tests = []
-        for node in self._tree_nodes.values():
-            if (
-                node.data
-                and (node.data["type"] in [NodeType.FUNCTION, NodeType.COROUTINE])
-                and node.data["favourite"]
-            ):
-                marked_tests.append(node.data["nodeid"])
-        return marked_tests
-
-    @property
-    def test_nodes(self) -> list[TreeNode]:
-        test_nodes = []
-        for node in self._tree_nodes.values():
-            if node.data:
-                test_nodes.append(node)
-        return test_nodes
+        return self.store.marked_nodeids()
 
     def reset_test_results(self):
-        # reset self.filtered_data_test_tree,
-        # to also reset results that were hidden by the filter
-        self.reset_status_counters()
-        for node in self._tree_nodes.values():
-            if node.data:
-                node.data["status"] = ""
-                node.refresh()
+        # reset the results of all tests, also the ones hidden by the filter
+        self.store.reset_results()
+        for counters in self.node_counters.values():
+            counters.statuses = Counter({"": counters.tests})
+
+        # tests hidden by a result filter are visible without a result
+        hidden_bits = self.store.bits(self.store.is_test) & ~self.store.bits(
+            self.store.visible
+        )
+        nodeids_to_show = set()
+        for node_id in self.store.select(hidden_bits):
+            if self.is_test_visible(node_id=node_id):
+                self.show_test(node_id=node_id)
+                nodeids_to_show.add(self.store.nodeids[node_id])
+        self.add_test_nodes(nodeids=nodeids_to_show)
+        self.update_counters()
+        self.refresh_lines()
@@ -0,0 +1,66 @@
+from textual.app import App
+
+from ayu.event_dispatcher import EventDispatcher
+from ayu.widgets.coverage_explorer import CoverageExplorer, CoverageTable
+
+
+class CoverageApp(App):
+    """Only the coverage explorer, without starting the websocket server or pytest"""
+
+    def __init__(self):
+        super().__init__()
+        self.dispatcher = EventDispatcher(host="localhost", port=1358)
+
+    def compose(self):
+        yield CoverageExplorer()
+
+
+def coverage_part(*file_names: str) -> dict:
+    return {
+        file_name: {
+            "n_statements": 4,
+            "n_missed": 1,
+            "percent_covered": 75.0,
+            "lines_missing": [3],
+        }
+        for file_name in file_names
+    }
+
+
+async def test_coverage_table_fills_in_parts(tmp_path, monkeypatch):
+    # the preview opens the highlighted file
+    monkeypatch.chdir(tmp_path)
+    for file_name in ["a.py", "b.py", "c.py", "d.py", "e.py"]:
+        (tmp_path / file_name).write_text("a = 1\nif a:\n    b = 2\n")
+
+    app = CoverageApp()
+    async with app.run_test() as pilot:
+        explorer = app.query_one(CoverageExplorer)
+        table = app.query_one(CoverageTable)
+
+        explorer.update_coverage_dict(
+            {"coverage_dict": coverage_part("a.py", "b.py"), "is_first_part": True}
+        )
+        await pilot.pause()
+        assert table.row_count == 2
+
+        # the parts arrive in the order they finish, the rows stay sorted by path
+        for file_name in ["d.py", "c.py"]:
+            explorer.update_coverage_dict(
+                {"coverage_dict": coverage_part(file_name), "is_first_part": False}
+            )
+        await pilot.pause()
+        assert [row[0] for row in map(table.get_row_at, range(table.row_count))] == [
+            "a.py",
+            "b.py",
+            "c.py",
+            "d.py",
+        ]
+        assert list(table.coverage_dict) == ["a.py", "b.py", "c.py", "d.py"]
+
+        # the next run starts with a new table
+        explorer.update_coverage_dict(
+            {"coverage_dict": coverage_part("e.py"), "is_first_part": True}
+        )
+        await pilot.pause()
+        assert table.row_count == 1
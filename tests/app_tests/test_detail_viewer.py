@@ -0,0 +1,109 @@
+from textual.app import App
+from textual.containers import Container
+
+from ayu.classes.report_store import ReportStore, summarize_report
+from ayu.event_dispatcher import EventDispatcher
+from ayu.utils import ReportLineType
+from ayu.widgets.detail_viewer import TestResultDetails
+
+
+class DetailsApp(App):
+    """Only the failure details, without starting the websocket server or pytest"""
+
+    def __init__(self, report_store: ReportStore):
+        super().__init__()
+        self.dispatcher = EventDispatcher(host="localhost", port=1357)
+        self.report_store = report_store
+
+    def compose(self):
+        with Container():
+            yield TestResultDetails()
+
+    def on_unmount(self):
+        self.report_store.close()
+
+
+def report(nodeid: str, text: str) -> dict:
+    return {
+        "nodeid": nodeid,
+        "outcome": "failed",
+        "longreprtext": text,
+        "caplog": "",
+        "duration": 0.1,
+    }
+
+
+async def show_selected_report(pilot):
+    await pilot.app.workers.wait_for_complete()
+    await pilot.pause()
+
+
+async def test_report_is_paged(monkeypatch, tmp_path):
+    monkeypatch.setattr("ayu.widgets.detail_viewer.REPORT_PAGE_SIZE", 100)
+    report_lines = [f"line {line_no}" for line_no in range(250)]
+    report_lines[-2:] = [">       assert 1 == 2", "E       assert 1 == 2"]
+    report_lines[60] = "E       early error"
+    report_store = ReportStore(path=tmp_path / "reports.sqlite")
+    report_store.add(report=report("test_a.py::test_a", "\n".join(report_lines)))
+
+    app = DetailsApp(report_store=report_store)
+    async with app.run_test() as pilot:
+        details = app.query_one(TestResultDetails)
+        details.report_data = {
+            "test_a.py::test_a": summarize_report(
+                report=report_store.get("test_a.py::test_a")
+            )
+        }
+        details.selected_node_id = "test_a.py::test_a"
+        await show_selected_report(pilot)
+
+        # only the last page is loaded
+        assert details.document.line_count == 100
+        assert details.first_loaded_line == 150
+        assert details.text.endswith("E       assert 1 == 2")
+        assert details.line_types[-2:] == [
+            ReportLineType.FAILED_LINE,
+            ReportLineType.ERROR,
+        ]
+
+        # scrolling to the top loads the previous page, the shown lines stay
+        details.scroll_to(y=0, animate=False, immediate=True)
+        await pilot.pause()
+        assert details.first_loaded_line == 50
+        assert details.document.line_count == 200
+        assert details.scroll_y == 100
+        # only the new page was classified and put in front of the loaded lines
+        assert details.line_types[10] == ReportLineType.ERROR
+
+        details.scroll_to(y=0, animate=False, immediate=True)
+        await pilot.pause()
+        assert details.first_loaded_line == 0
+        assert details.text == "\n".join(report_lines)
+        assert details.line_types[60] == ReportLineType.ERROR
+        assert details.scroll_y == 50
+
+        details.selected_node_id = ""
+        await show_selected_report(pilot)
+        assert details.text == ""
+
+
+async def test_reports_are_fetched_on_selection(tmp_path):
+    report_store = ReportStore(path=tmp_path / "reports.sqlite")
+    app = DetailsApp(report_store=report_store)
+    async with app.run_test() as pilot:
+        details = app.query_one(TestResultDetails)
+        report_store.add(report=report("test_a.py::test_a", ""))
+        details.update_report_data([summarize_report(report("test_a.py::test_a", ""))])
+        details.selected_node_id = "test_a.py::test_b"
+        await show_selected_report(pilot)
+        assert details.text == ""
+
+        # the report of the selected test arrives while the run continues
+        failure = report("test_a.py::test_b", "E   assert False")
+        report_store.add(report=failure)
+        details.update_report_data([summarize_report(report=failure)])
+        await show_selected_report(pilot)
+        assert list(details.report_data) == ["test_a.py::test_a", "test_a.py::test_b"]
+        # only the summary is kept in the app
+        assert "longreprtext" not in details.report_data["test_a.py::test_b"]
+        assert details.text == "E   assert False"
@@ -1,23 +1,150 @@
 import sys
 import os
+import sqlite3
 
 import pytest
 
 from ayu.app import AyuApp
+from ayu.widgets.detail_viewer import DetailView, TestResultDetails
+from ayu.widgets.navigation import TestTree
+
+
+async def wait_until(pilot, condition, message: str, pauses: int = 200):
+    """Pause until the condition holds, at most `pauses` times 0.05s"""
+    for _ in range(pauses):
+        if condition():
+            return
+        await pilot.pause(0.05)
+    pytest.fail(message)
+
+
+def worker_running(app: AyuApp, group: str) -> bool:
+    return any(
+        not worker.is_finished for worker in app.workers if worker.group == group
+    )
+
+
+def collection_finished(app: AyuApp) -> bool:
+    # the streamed parts show the progress in the sub title, the last event clears it
+    return (
+        app.counter_total_tests > 0
+        and not app.sub_title
+        and not worker_running(app, group="Collector")
+    )
 
 
 # @pytest.mark.xdist_group(name="group1")
 @pytest.mark.skipif(sys.platform.startswith("win"), reason="Windows is too slow")
-async def test_app_screen(testcase_path):
-    os.environ["AYU_PORT"] = "1338"
-    os.environ["AYU_HOST"] = "localhost"
-
-    test_app = AyuApp(test_path=testcase_path)
+async def test_app_screen(testcase_path, tmp_path):
+    test_app = AyuApp(
+        test_path=testcase_path,
+        host="localhost",
+        port=1338,
+        report_store_path=tmp_path / "reports.sqlite",
+    )
     async with test_app.run_test() as pilot:
-        # Wait for test collection
-        await pilot.pause(3)
+        await wait_until(
+            pilot,
+            lambda: collection_finished(pilot.app),
+            message="tests were not collected within 10s",
+        )
 
         assert pilot.app.data_test_tree
+    # only the pytest subprocesses get the store of this app
+    assert "AYU_REPORT_STORE" not in os.environ
+    assert test_app.subprocess_env["AYU_REPORT_STORE"] == str(
+        tmp_path / "reports.sqlite"
+    )
+    assert test_app.subprocess_env["AYU_PORT"] == "1338"
+    # the report store is closed with the app
+    with pytest.raises(sqlite3.ProgrammingError):
+        test_app.report_store.connection.execute("SELECT 1")
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Windows is too slow")
+async def test_app_streamed_collection(testcase_path, tmp_path):
+    test_app = AyuApp(
+        test_path=testcase_path,
+        host="localhost",
+        port=1354,
+        report_store_path=tmp_path / "reports.sqlite",
+    )
+    async with test_app.run_test() as pilot:
+        await wait_until(
+            pilot,
+            lambda: collection_finished(pilot.app),
+            message="tests were not collected within 10s",
+        )
+
+        tree = pilot.app.query_one(TestTree)
+        nodeids = [
+            node.data["nodeid"]
+            for node in tree._tree_nodes.values()
+            if isinstance(node.data, dict)
+        ]
+        tests = [
+            node
+            for node in tree._tree_nodes.values()
+            if node.data and not node.children
+        ]
+        # every module was merged into the tree exactly once
+        assert len(nodeids) == len(set(nodeids))
+        assert len(tests) == pilot.app.counter_total_tests
+        assert not pilot.app.sub_title
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Windows is too slow")
+async def test_app_preview_debounce(testcase_path, tmp_path, monkeypatch):
+    previews = []
+    show_test = DetailView.show_test
+
+    def show_test_spy(self, file_path, start_line_no):
+        previews.append((file_path.as_posix(), start_line_no))
+        return show_test(self, file_path=file_path, start_line_no=start_line_no)
+
+    monkeypatch.setattr(DetailView, "show_test", show_test_spy)
+
+    test_app = AyuApp(
+        test_path=testcase_path,
+        host="localhost",
+        port=1356,
+        report_store_path=tmp_path / "reports.sqlite",
+    )
+    async with test_app.run_test() as pilot:
+        tree = pilot.app.query_one(TestTree)
+        await wait_until(
+            pilot,
+            lambda: collection_finished(pilot.app) and tree.last_line > 12,
+            message="tests were not collected within 10s",
+        )
+        tree.focus()
+        await pilot.pause()
+        await wait_until(
+            pilot,
+            lambda: not worker_running(pilot.app, group="Preview"),
+            message="the preview of the first test was not shown",
+        )
+        previews.clear()
+
+        # move without waiting in between, like holding down a key
+        for _ in range(12):
+            tree.action_cursor_down()
+        node_data = tree.cursor_node.data
+        details = pilot.app.query_one(TestResultDetails)
+        await wait_until(
+            pilot,
+            lambda: details.selected_node_id == node_data["nodeid"],
+            message="the preview of the final selection was not shown",
+        )
+        await wait_until(
+            pilot,
+            lambda: not worker_running(pilot.app, group="Preview"),
+            message="the preview worker did not finish",
+        )
+
+        # only the final selection was previewed, not every passed test
+        assert len(previews) == 1
+        assert previews[0][0] == node_data["path"]
 
 
 # @pytest.mark.xdist_group(name='group1')
@@ -49,3 +176,171 @@ async def test_app_screen(testcase_path):
 #             await pilot.pause(2)
 #
 #             assert pilot.app.data_test_tree
+
+
+async def test_tree_node_counters(tree_app, make_node):
+    module = make_node("test_mod.py", "MODULE")
+    test_class = make_node("TestClass", "CLASS", module)
+    for name in ["test_a", "test_b"]:
+        make_node(name, "FUNCTION", test_class)
+    for name in ["test_c", "test_d"]:
+        make_node(name, "FUNCTION", module)
+    class_tests = ["test_mod.py::TestClass::test_a", "test_mod.py::TestClass::test_b"]
+
+    app = tree_app(test_count=4)
+    async with app.run_test():
+        tree = app.query_one(TestTree)
+        tree.filtered_data_test_tree = {"test_mod.py": module}
+        module_node = tree.get_node_by_nodeid(nodeid="test_mod.py")
+        class_node = tree.get_node_by_nodeid(nodeid="test_mod.py::TestClass")
+
+        tree.mark_tests_as_running(nodeids=class_tests)
+        assert tree.node_counters[tree.store.ids["test_mod.py"]].tests == 4
+        assert tree.get_number_of_tests_queued_of_node(node=module_node) == 2
+
+        tree.update_test_outcome(
+            [{"nodeid": nodeid, "outcome": "PASSED"} for nodeid in class_tests]
+        )
+        assert tree.get_number_of_passed_tests_of_node(node=module_node) == 2
+        assert not class_node.is_expanded
+        assert module_node.is_expanded
+
+        tree.update_test_outcome(
+            [
+                {"nodeid": "test_mod.py::test_c", "outcome": "PASSED"},
+                {"nodeid": "test_mod.py::test_d", "outcome": "FAILED"},
+            ]
+        )
+        assert tree.node_counters[tree.store.ids["test_mod.py"]].statuses["FAILED"] == 1
+        assert module_node.is_expanded
+
+        tree.reset_test_results()
+        assert tree.get_number_of_tests_queued_of_node(node=module_node) == 0
+
+        tree.action_mark_test_as_fav(node=class_node)
+        assert tree.marked_tests == class_tests
+        assert tree.counter_marked == 2
+        tree.action_mark_test_as_fav_from_search(nodeid=class_tests[0])
+        assert tree.marked_tests == class_tests[1:]
+        assert not tree.store.favourite[tree.store.ids["test_mod.py::TestClass"]]
+
+
+async def test_tree_filter_without_rebuild(tree_app, make_node):
+    module = make_node("test_mod.py", "MODULE")
+    test_class = make_node("TestClass", "CLASS", module)
+    for name in ["test_a", "test_b"]:
+        make_node(name, "FUNCTION", test_class)
+    for name in ["test_c", "test_d", "test_e"]:
+        make_node(name, "FUNCTION", module)
+    outcomes = {
+        "test_mod.py::TestClass::test_a": "PASSED",
+        "test_mod.py::TestClass::test_b": "PASSED",
+        "test_mod.py::test_c": "FAILED",
+        "test_mod.py::test_d": "PASSED",
+    }
+
+    def visible_nodeids(tree):
+        return [
+            line.node.data["nodeid"]
+            for line in tree._tree_lines
+            if line.node.data is not None
+        ]
+
+    app = tree_app(test_count=5)
+    async with app.run_test():
+        tree = app.query_one(TestTree)
+        tree.filtered_data_test_tree = {"test_mod.py": module}
+        tree.mark_tests_as_running(nodeids=list(outcomes))
+        tree.update_test_outcome(
+            [
+                {"nodeid": nodeid, "outcome": outcome}
+                for nodeid, outcome in outcomes.items()
+            ]
+        )
+        tree.root.expand_all()
+        all_nodeids = visible_nodeids(tree)
+        cursor_node = tree.get_node_by_nodeid(nodeid="test_mod.py::test_c")
+
+        tree.filter = {**tree.filter, "show_passed": False}
+        assert visible_nodeids(tree) == [
+            "test_mod.py",
+            "test_mod.py::test_c",
+            "test_mod.py::test_e",
+        ]
+        assert tree.counter_passed == 0
+        assert tree.filtered_counter_total_tests == 2
+        # the remaining nodes were not rebuilt
+        assert tree.get_node_by_nodeid(nodeid="test_mod.py::test_c") is cursor_node
+
+        tree.filter = {**tree.filter, "show_passed": True}
+        assert visible_nodeids(tree) == all_nodeids
+        assert tree.counter_passed == 3
+        assert tree.filtered_counter_total_tests == 5
+
+        tree.filter = {**tree.filter, "show_failed": False}
+        tree.reset_test_results()
+        assert visible_nodeids(tree) == all_nodeids
+        assert tree.filtered_counter_total_tests == 5
+
+
+async def test_lazy_tree(tree_app, make_node, monkeypatch):
+    monkeypatch.setattr("ayu.widgets.navigation.LAZY_TREE_THRESHOLD", 2)
+    module = make_node("test_mod.py", "MODULE")
+    test_class = make_node("TestClass", "CLASS", module)
+    for name in ["test_a", "test_b"]:
+        make_node(name, "FUNCTION", test_class)
+    make_node("test_c", "FUNCTION", module)
+    class_tests = ["test_mod.py::TestClass::test_a", "test_mod.py::TestClass::test_b"]
+
+    app = tree_app(test_count=3)
+    async with app.run_test():
+        tree = app.query_one(TestTree)
+        tree.filtered_data_test_tree = {"test_mod.py": module}
+        assert tree.is_lazy
+        class_node = tree.get_node_by_nodeid(nodeid="test_mod.py::TestClass")
+        assert not class_node.is_expanded
+        # children of the collapsed class are not created yet
+        assert tree.get_node_by_nodeid(nodeid=class_tests[0]) is None
+
+        tree.mark_tests_as_running(nodeids=class_tests)
+        tree.update_test_outcome(
+            [
+                {"nodeid": class_tests[0], "outcome": "PASSED"},
+                {"nodeid": class_tests[1], "outcome": "FAILED"},
+            ]
+        )
+        assert tree.get_number_of_passed_tests_of_node(node=class_node) == 1
+        assert tree.counter_failed == 1
+        assert tree.get_node_by_nodeid(nodeid=class_tests[0]) is None
+
+        node = tree.reveal_node(nodeid=class_tests[1])
+        assert node is not None
+        assert tree.store.get_status(node_id=tree.store.ids[class_tests[1]]) == "FAILED"
+        assert class_node.is_expanded
+        assert tree.get_node_by_nodeid(nodeid=class_tests[0]) is not None
+
+
+async def test_tree_markers(tree_app, make_node):
+    module = make_node("test_mod.py", "MODULE")
+    for name in ["test_a", "test_b", "test_c"]:
+        make_node(
+            name, "FUNCTION", module, markers=[] if name == "test_b" else ["slow"]
+        )
+    slow_tests = ["test_mod.py::test_a", "test_mod.py::test_c"]
+
+    app = tree_app(test_count=3)
+    async with app.run_test():
+        tree = app.query_one(TestTree)
+        tree.filtered_data_test_tree = {"test_mod.py": module}
+
+        tree.highlight_marker_rows(marker="slow")
+        assert [node.data["nodeid"] for node in tree.highlighted_nodes] == slow_tests
+        assert all(node._hover for node in tree.highlighted_nodes)
+        tree.highlight_marker_rows(marker="unknown")
+        assert not tree.highlighted_nodes
+
+        tree.mark_test_as_fav_from_markers(marker="slow")
+        assert tree.marked_tests == slow_tests
+        assert tree.counter_marked == 2
+        tree.mark_test_as_fav_from_markers(marker="slow")
+        assert not tree.marked_tests
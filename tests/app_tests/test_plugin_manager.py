@@ -1,5 +1,4 @@
 import sys
-import os
 
 import pytest
 
@@ -9,10 +8,13 @@ from ayu.widgets.modals.plugin_manager import ModalPlugin
 
 # @pytest.mark.xdist_group(name="group2")
 @pytest.mark.skipif(sys.platform.startswith("win"), reason="Windows is too slow")
-async def test_app_plugins(testcase_path):
-    os.environ["AYU_PORT"] = "1339"
-    os.environ["AYU_HOST"] = "localhost"
-    test_app = AyuApp(test_path=testcase_path)
+async def test_app_plugins(testcase_path, tmp_path):
+    test_app = AyuApp(
+        test_path=testcase_path,
+        host="localhost",
+        port=1339,
+        report_store_path=tmp_path / "reports.sqlite",
+    )
     async with test_app.run_test() as pilot:
         # Wait for test collection
         await pilot.press("P")
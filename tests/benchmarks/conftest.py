@@ -0,0 +1,36 @@
+import pytest
+
+
+@pytest.fixture()
+def synthetic_collection(make_node):
+    """Builds a COLLECTION payload like `build_dict_tree`,
+    with parametrized tests spread over several modules"""
+
+    def build(test_count: int, tests_per_module: int = 100) -> dict:
+        root = make_node("tests", "DIR")
+        for module_index in range(0, test_count, tests_per_module):
+            module_name = f"test_module_{module_index // tests_per_module}.py"
+            module = make_node(
+                module_name,
+                "MODULE",
+                root,
+                nodeid=f"tests/{module_name}",
+                path=f"/home/user/project/tests/{module_name}",
+            )
+            for test_index in range(
+                module_index, min(module_index + tests_per_module, test_count)
+            ):
+                make_node(
+                    f"test_case[{test_index}]",
+                    "FUNCTION",
+                    module,
+                    markers=["slow"] if test_index % 10 == 7 else [],
+                    path=module["path"],
+                    lineno=10,
+                )
+        return {
+            "tree": {"tests": root},
+            "meta": {"test_count": test_count, "markers": ["slow"]},
+        }
+
+    return build
@@ -0,0 +1,99 @@
+"""Time to build the collection tree of large synthetic sessions
+
+run with `pytest tests/benchmarks -m benchmark -n0 -s --no-cov` to see the results
+"""
+
+from pathlib import Path
+import gc
+import time
+
+import pytest
+
+from ayu.utils import build_dict_tree
+
+
+# deselected by default, see the pytest options in pyproject.toml
+pytestmark = pytest.mark.benchmark
+
+
+class SyntheticNode:
+    """Provides the attributes of a pytest node, which are used by `build_dict_tree`"""
+
+    def __init__(self, name: str, parent: "SyntheticNode | None"):
+        self.name = name
+        self.parent = parent
+        if parent is None:
+            self.nodeid = ""
+        elif parent.nodeid:
+            separator = "::" if parent.name.endswith(".py") else "/"
+            self.nodeid = f"{parent.nodeid}{separator}{name}"
+        else:
+            self.nodeid = name
+        self.path = Path(self.nodeid.split("::")[0])
+        self.own_markers = []
+
+    def listchain(self) -> list["SyntheticNode"]:
+        chain = []
+        node = self
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        return chain[::-1]
+
+
+def synthetic_items(test_count: int, tests_per_module: int) -> list[SyntheticNode]:
+    session = SyntheticNode(name="session", parent=None)
+    tests = SyntheticNode(name="tests", parent=session)
+    items = []
+    for module_index in range(0, test_count, tests_per_module):
+        module = SyntheticNode(
+            name=f"test_module_{module_index // tests_per_module}.py", parent=tests
+        )
+        items.extend(
+            SyntheticNode(name=f"test_case[{test_index}]", parent=module)
+            for test_index in range(
+                module_index, min(module_index + tests_per_module, test_count)
+            )
+        )
+    return items
+
+
+def measure(items: list[SyntheticNode]) -> float:
+    # best of three without garbage collection pauses,
+    # to be less sensitive to other running tests
+    times = []
+    gc.disable()
+    try:
+        for _ in range(3):
+            start = time.perf_counter()
+            build_dict_tree(items=items)
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+@pytest.mark.parametrize(
+    "tests_per_module", [100, 100_000], ids=["many modules", "one module"]
+)
+def test_build_tree_benchmark(tests_per_module):
+    small_items = synthetic_items(test_count=10_000, tests_per_module=tests_per_module)
+    large_items = synthetic_items(test_count=100_000, tests_per_module=tests_per_module)
+
+    small_time = measure(items=small_items)
+    large_time = measure(items=large_items)
+    print(
+        f"\n{tests_per_module} tests per module:"
+        + f" 10k tests {small_time * 1000:8.1f} ms"
+        + f" | 100k tests {large_time * 1000:8.1f} ms"
+    )
+
+    tree = build_dict_tree(items=large_items)
+    assert tree["meta"]["test_count"] == 100_000
+    assert (
+        sum(len(module["children"]) for module in tree["tree"]["tests"]["children"])
+        == 100_000
+    )
+    # 10 times the tests should take about 10 times as long,
+    # quadratic scaling with the number of siblings would be around 100 times
+    assert large_time < small_time * 30
@@ -0,0 +1,95 @@
+"""Bytes on the wire and encode/decode time of the event codecs
+
+run with `pytest tests/benchmarks -m benchmark -n0 -s --no-cov` to see the results
+"""
+
+import json
+import time
+
+import pytest
+
+from ayu.classes.event import CODECS, Event
+from ayu.utils import EventType, expand_flat_tree, flatten_dict_tree
+
+
+# deselected by default, see the pytest options in pyproject.toml
+pytestmark = pytest.mark.benchmark
+
+
+def serialize_indented(event: Event) -> str:
+    """Format used before the codecs were introduced"""
+    return json.dumps(
+        {"type": event.event_type, "payload": event.event_payload}, indent=4
+    )
+
+
+def message_size(message: str | bytes) -> int:
+    return len(message.encode() if isinstance(message, str) else message)
+
+
+def measure(encode, decode, compress=None) -> tuple[int, int, float, float]:
+    start = time.perf_counter()
+    message = encode()
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decode(message)
+    decode_time = time.perf_counter() - start
+
+    compressed_size = message_size(compress(message) if compress else message)
+    return message_size(message), compressed_size, encode_time, decode_time
+
+
+@pytest.mark.parametrize("test_count", [1_000, 10_000, 100_000])
+def test_codec_benchmark(synthetic_collection, test_count):
+    event = Event(
+        event_type=EventType.COLLECTION,
+        event_payload=synthetic_collection(test_count=test_count),
+    )
+
+    results = {
+        "indented json": measure(
+            encode=lambda: serialize_indented(event), decode=json.loads
+        ),
+        "legacy json": measure(
+            encode=event.serialize, decode=lambda message: Event.deserialize(message)
+        ),
+    }
+    for codec_name, codec in CODECS.items():
+        results[codec_name] = measure(
+            encode=lambda: event.serialize(codec=codec_name),
+            decode=lambda message: Event.deserialize(message, codec=codec_name),
+            compress=codec.compress,
+        )
+
+    print(f"\n{test_count} tests")
+    for name, (size, compressed_size, encode_time, decode_time) in results.items():
+        print(
+            f"{name:>15}: {size / 2**20:8.2f} MiB"
+            + f" | compressed {compressed_size / 2**20:8.2f} MiB"
+            + f" | encode {encode_time * 1000:8.1f} ms"
+            + f" | decode {decode_time * 1000:8.1f} ms"
+        )
+
+    # the codecs are compared with the compact json, which is sent without one
+    legacy_size = results["legacy json"][0]
+    assert results["ayu.binary.v1"][1] < legacy_size / 5
+    if "ayu.msgpack.v1" in CODECS:
+        assert results["ayu.msgpack.v1"][0] < legacy_size * 0.9
+        assert results["ayu.msgpack.v1"][1] < legacy_size / 5
+
+
+@pytest.mark.parametrize("test_count", [1_000, 10_000, 100_000])
+def test_flat_collection_benchmark(synthetic_collection, test_count):
+    collection = synthetic_collection(test_count=test_count)
+    flat_collection = flatten_dict_tree(data=collection)
+
+    nested_size = len(json.dumps(collection, separators=(",", ":")))
+    flat_size = len(json.dumps(flat_collection, separators=(",", ":")))
+    print(
+        f"\n{test_count} tests: nested {nested_size / 2**20:8.2f} MiB"
+        + f" | flat {flat_size / 2**20:8.2f} MiB"
+    )
+
+    assert flat_size < nested_size / 3
+    assert expand_flat_tree(data=flat_collection) == collection
@@ -0,0 +1,98 @@
+"""Time from the last highlighted test to the painted preview while navigating fast
+
+run with `pytest tests/benchmarks -m benchmark -n0 -s --no-cov` to see the results
+"""
+
+import statistics
+import time
+
+import pytest
+
+from ayu.app import AyuApp
+from ayu.constants import PREVIEW_DEBOUNCE_TIME
+from ayu.widgets.detail_viewer import CodePreview, DetailView
+from ayu.widgets.navigation import TestTree
+
+
+# deselected by default, see the pytest options in pyproject.toml
+pytestmark = pytest.mark.benchmark
+
+# keystroke to paint target on top of the debounce, reading the file
+# and highlighting the preview should fit into a few frames
+PREVIEW_LATENCY_BUDGET = 0.1
+
+
+@pytest.mark.parametrize("rounds", [10])
+async def test_preview_latency_benchmark(testcase_path, tmp_path, monkeypatch, rounds):
+    shown_at: list[float] = []
+    painted_at: list[float] = []
+    show_test = DetailView.show_test
+    render_line = CodePreview.render_line
+
+    def show_test_spy(self, file_path, start_line_no):
+        show_test(self, file_path=file_path, start_line_no=start_line_no)
+        shown_at.append(time.perf_counter())
+
+    def render_line_spy(self, y):
+        # the first line painted after the preview changed
+        if len(painted_at) < len(shown_at):
+            painted_at.append(time.perf_counter())
+        return render_line(self, y)
+
+    monkeypatch.setattr(DetailView, "show_test", show_test_spy)
+    monkeypatch.setattr(CodePreview, "render_line", render_line_spy)
+
+    app = AyuApp(
+        test_path=testcase_path,
+        host="localhost",
+        port=1364,
+        report_store_path=tmp_path / "reports.sqlite",
+    )
+    async with app.run_test() as pilot:
+        tree = app.query_one(TestTree)
+        for _ in range(200):
+            if tree.last_line > 12 and not app.sub_title:
+                break
+            await pilot.pause(0.05)
+        else:
+            pytest.fail("tests were not collected within 10s")
+        # the preview is only painted, once the details are shown
+        app.action_show_details()
+        tree.focus()
+        await pilot.pause(1)
+
+        latencies = []
+        paint_latencies = []
+        for round_index in range(rounds):
+            shown_at.clear()
+            painted_at.clear()
+            # move without waiting in between, like holding down a key
+            for _ in range(12):
+                if round_index % 2:
+                    tree.action_cursor_up()
+                else:
+                    tree.action_cursor_down()
+            last_highlight = time.perf_counter()
+            for _ in range(100):
+                if painted_at:
+                    break
+                await pilot.pause(0.01)
+            else:
+                pytest.fail("the preview was not painted within 1s")
+
+            # only the final selection was previewed
+            assert len(shown_at) == 1
+            latencies.append(shown_at[0] - last_highlight)
+            paint_latencies.append(painted_at[0] - last_highlight)
+            await pilot.pause(0.2)
+
+    print(
+        f"\nlast highlight to preview: median {statistics.median(latencies):.3f} s"
+        + f" max {max(latencies):.3f} s"
+        + f" | to paint: median {statistics.median(paint_latencies):.3f} s"
+        + f" max {max(paint_latencies):.3f} s"
+        + f" | target {PREVIEW_DEBOUNCE_TIME + PREVIEW_LATENCY_BUDGET:.3f} s"
+    )
+    assert statistics.median(paint_latencies) < (
+        PREVIEW_DEBOUNCE_TIME + PREVIEW_LATENCY_BUDGET
+    )
@@ -0,0 +1,62 @@
+"""Time the test tree needs to apply outcome events of a large test run
+
+run with `pytest tests/benchmarks -m benchmark -n0 -s --no-cov` to see the results
+"""
+
+import time
+
+import pytest
+
+from ayu.utils import TestOutcome
+from ayu.widgets.navigation import TestTree
+
+
+# deselected by default, see the pytest options in pyproject.toml
+pytestmark = pytest.mark.benchmark
+
+
+def collect_test_nodeids(child_list: list[dict]) -> list[str]:
+    nodeids = []
+    for child in child_list:
+        if child["children"]:
+            nodeids.extend(collect_test_nodeids(child_list=child["children"]))
+        else:
+            nodeids.append(child["nodeid"])
+    return nodeids
+
+
+@pytest.mark.parametrize("test_count", [50_000])
+async def test_tree_outcome_benchmark(synthetic_collection, tree_app, test_count):
+    collection = synthetic_collection(test_count=test_count)
+    nodeids = collect_test_nodeids(child_list=list(collection["tree"].values()))
+    outcomes = [TestOutcome.PASSED, TestOutcome.FAILED, TestOutcome.SKIPPED]
+
+    app = tree_app(test_count=test_count)
+    async with app.run_test() as pilot:
+        tree = app.query_one(TestTree)
+
+        start = time.perf_counter()
+        tree.filtered_data_test_tree = collection["tree"]
+        build_time = time.perf_counter() - start
+
+        tree.mark_tests_as_running(nodeids=nodeids)
+        start = time.perf_counter()
+        for index, nodeid in enumerate(nodeids):
+            tree.update_test_outcome(
+                {"nodeid": nodeid, "outcome": outcomes[index % len(outcomes)]}
+            )
+        outcome_time = time.perf_counter() - start
+        await pilot.pause()
+
+        print(
+            f"\n{test_count} tests: build tree {build_time:6.2f} s"
+            + f" | {test_count} outcome events {outcome_time:6.2f} s"
+        )
+
+        assert tree.counter_queued == 0
+        assert tree.counter_passed == len(nodeids[::3])
+        assert tree.store.get_status(node_id=tree.store.ids[nodeids[-1]])
+        # tests of collapsed modules are not created for large trees
+        assert len(tree.node_index) < test_count / 50
+        # a linear scan of the tree per event took minutes
+        assert outcome_time < 30
@@ -1,21 +1,83 @@
 from pathlib import Path
-import os
+from typing import Any, Iterable
 
 import pytest
 
 
 @pytest.fixture()
-def testcase_path() -> Path:
+def testcase_path(monkeypatch) -> Path:
+    # the app collects the test cases in a subprocess, which would write
+    # to the coverage file of this run, e.g. while xdist workers combine it
+    monkeypatch.setenv("PYTEST_ADDOPTS", "--no-cov")
     return Path("tests/test_cases")
 
 
 @pytest.fixture()
-def test_host() -> str:
-    os.environ["AYU_HOST"] = "localhost"
+def test_host(monkeypatch) -> str:
+    monkeypatch.setenv("AYU_HOST", "localhost")
     return "localhost"
 
 
 @pytest.fixture()
-def test_port() -> int:
-    os.environ["AYU_PORT"] = "1338"
+def test_port(monkeypatch) -> int:
+    monkeypatch.setenv("AYU_PORT", "1338")
     return 1338
+
+
+@pytest.fixture()
+def tree_app():
+    # imported here, to keep the collection of tests/test_cases fast,
+    # which is used by the app tests
+    from textual.app import App
+
+    from ayu.event_dispatcher import EventDispatcher
+    from ayu.widgets.navigation import TestTree
+
+    class TreeApp(App):
+        """Only the test tree, without starting the websocket server or pytest"""
+
+        def __init__(self, test_count: int):
+            super().__init__()
+            self.dispatcher = EventDispatcher(host="localhost", port=1355)
+            self.counter_total_tests = test_count
+
+        def compose(self):
+            yield TestTree(label="Tests", id="testtree")
+
+    return TreeApp
+
+
+@pytest.fixture()
+def make_node():
+    """Builds the node dicts of a collection like `build_dict_tree`,
+    a node is appended to the children of its parent"""
+
+    def make(
+        name: str,
+        node_type: str = "FUNCTION",
+        parent: dict | None = None,
+        nodeid: str | None = None,
+        markers: Iterable[str] = (),
+        path: str | None = None,
+        lineno: int = 0,
+        children: list | None = None,
+    ) -> dict[str, Any]:
+        nodeid = nodeid or (f"{parent['nodeid']}::{name}" if parent else name)
+        node = {
+            "name": name,
+            "nodeid": nodeid,
+            "markers": list(markers),
+            "path": path or nodeid.split("::")[0],
+            "lineno": lineno,
+            "parent_name": parent["name"] if parent else None,
+            "parent_type": parent["type"] if parent else None,
+            "type": node_type,
+            "favourite": False,
+            "status": "",
+            "children": children or [],
+        }
+        if parent:
+            parent["children"].append(node)
+        return node
+
+    return make
@@ -0,0 +1,74 @@
+import pytest
+
+from ayu.classes.event import (
+    CODECS,
+    BinaryCodec,
+    Event,
+    EventCodec,
+    get_codec,
+    select_codec,
+)
+from ayu.utils import EventType
+
+
+@pytest.mark.parametrize("codec", [None, *CODECS])
+@pytest.mark.parametrize(
+    "event",
+    (
+        Event(
+            event_type=EventType.OUTCOME,
+            event_payload=[{"nodeid": "test_a.py::test_ä", "outcome": "PASSED"}],
+        ),
+        Event(event_type=EventType.SCHEDULED, event_payload=["test_a.py::test_b"]),
+        Event(event_type=EventType.DEBUG, event_payload={}),
+    ),
+)
+def test_event_roundtrip(event, codec):
+    message = event.serialize(codec=codec)
+    assert Event.deserialize(message, codec=codec) == event
+
+
+def test_legacy_format_is_compact():
+    event = Event(event_type=EventType.DEBUG, event_payload={"test": "test"})
+    assert event.serialize() == '{"type":"DEBUG","payload":{"test":"test"}}'
+
+
+def test_select_codec():
+    assert select_codec(None, ["json", "ayu.binary.v1"]) == "ayu.binary.v1"
+    assert select_codec(None, ["ayu.binary"]) is None
+    assert select_codec(None, ["unknown"]) is None
+    assert select_codec(None, []) is None
+    assert get_codec(None) is get_codec("unknown")
+
+
+def test_binary_codec_compression():
+    codec = get_codec("ayu.binary.v1")
+    event = Event(
+        event_type=EventType.REPORT,
+        event_payload={"report": {"longreprtext": "Traceback line\n" * 1000}},
+    )
+    message = codec.encode(event=event)
+    compressed_message = codec.compress(message=message)
+
+    assert len(compressed_message) < len(message) / 10
+    assert codec.decode(message=compressed_message) == event
+    assert get_codec(None).compress(message="text") == "text"
+
+
+def test_binary_codec_event_type_ids():
+    # every event type has its own id, which does not depend on the enum order
+    assert set(BinaryCodec.EVENT_TYPE_IDS) == set(EventType)
+    assert len(set(BinaryCodec.EVENT_TYPE_IDS.values())) == len(EventType)
+    message = get_codec("ayu.binary.v1").encode(
+        event=Event(event_type=EventType.REPORT, event_payload=[])
+    )
+    assert message == b"\x03\x00[]"
+
+
+def test_codecs_implement_encode_and_decode():
+    class IncompleteCodec(EventCodec):
+        def encode(self, event: Event) -> str:
+            return ""
+
+    with pytest.raises(TypeError):
+        IncompleteCodec()
@@ -0,0 +1,429 @@
+import asyncio
+from contextlib import suppress
+import sys
+import threading
+import time
+
+import pytest
+
+from ayu.classes.event import Event
+from ayu.event_dispatcher import (
+    EventBatcher,
+    EventDispatcher,
+    EventQueue,
+    EventSender,
+)
+from ayu.utils import EventType, QueuePolicy
+
+
+@pytest.fixture
+async def start_dispatcher():
+    """Starts dispatchers, their servers and tasks are closed after the test"""
+    started: list[tuple[EventDispatcher, asyncio.Task]] = []
+
+    async def start(
+        port: int, received: list, socket_path: str | None = None
+    ) -> EventDispatcher:
+        dispatcher = EventDispatcher(
+            host="localhost", port=port, socket_path=socket_path
+        )
+        dispatcher.register_handler(
+            event_type=EventType.OUTCOME, handler=lambda data: received.append(data)
+        )
+        task = asyncio.create_task(dispatcher.start())
+        started.append((dispatcher, task))
+        while dispatcher.server is None:
+            await asyncio.sleep(0.01)
+        return dispatcher
+
+    yield start
+
+    for dispatcher, task in started:
+        dispatcher.server.close()
+        await dispatcher.server.wait_closed()
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def wait_for(received: list, amount: int):
+    """Wait until the dispatcher handled the expected amount of payloads"""
+    for _ in range(100):
+        if len(received) >= amount:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_sender_reuses_connection(start_dispatcher):
+    received = []
+    await start_dispatcher(port=1350, received=received)
+
+    sender = EventSender(host="localhost", port=1350)
+    assert await asyncio.to_thread(sender.connect)
+    websocket = sender.websocket
+
+    for nodeid in ["test_a", "test_b", "test_c"]:
+        event = Event(
+            event_type=EventType.OUTCOME,
+            event_payload={"nodeid": nodeid, "outcome": "PASSED"},
+        )
+        assert await asyncio.to_thread(sender.send, event)
+
+    await wait_for(received, 3)
+    assert [data["nodeid"] for data in received] == ["test_a", "test_b", "test_c"]
+    assert sender.websocket is websocket
+
+    await asyncio.to_thread(sender.close)
+
+
+async def test_sender_reconnects_after_app_restart(start_dispatcher):
+    received = []
+    dispatcher = await start_dispatcher(port=1351, received=received)
+
+    sender = EventSender(host="localhost", port=1351)
+    assert await asyncio.to_thread(sender.connect)
+
+    dispatcher.server.close()
+    await dispatcher.server.wait_closed()
+    dispatcher = await start_dispatcher(port=1351, received=received)
+
+    event = Event(
+        event_type=EventType.OUTCOME,
+        event_payload={"nodeid": "test_a", "outcome": "PASSED"},
+    )
+    assert await asyncio.to_thread(sender.send, event)
+
+    await wait_for(received, 1)
+    assert received == [{"nodeid": "test_a", "outcome": "PASSED"}]
+
+    await asyncio.to_thread(sender.close)
+
+
+async def test_sender_thread_flushes_on_close(start_dispatcher):
+    received = []
+    await start_dispatcher(port=1352, received=received)
+
+    sender = EventSender(host="localhost", port=1352)
+    assert await asyncio.to_thread(sender.connect)
+    sender.start()
+
+    for index in range(50):
+        sender.send(
+            Event(
+                event_type=EventType.OUTCOME,
+                event_payload={"nodeid": f"test_{index}", "outcome": "PASSED"},
+            )
+        )
+    await asyncio.to_thread(sender.close)
+
+    await wait_for(received, 50)
+    assert [data["nodeid"] for data in received] == [
+        f"test_{index}" for index in range(50)
+    ]
+
+
+@pytest.mark.parametrize(
+    "policy,expected_payloads,expected_dropped",
+    (
+        [QueuePolicy.DROP_NEWEST, [["a"], {"b": 1}], 3],
+        [QueuePolicy.DROP_OLDEST, [["d"], ["e"]], 3],
+        [QueuePolicy.COALESCE, [{"c": 2}, ["d", "e"]], 2],
+    ),
+)
+def test_event_queue_policies(policy, expected_payloads, expected_dropped):
+    queue = EventQueue(maxsize=2, policy=policy)
+    for payload in [["a"], {"b": 1}, {"c": 2}, ["d"], ["e"]]:
+        queue.put(Event(event_type=EventType.OUTCOME, event_payload=payload))
+
+    queue.close()
+    payloads = []
+    while (event := queue.get()) is not None:
+        payloads.append(event.event_payload)
+        queue.task_done()
+
+    assert payloads == expected_payloads
+    assert queue.dropped == expected_dropped
+    assert queue.join(timeout=0)
+
+
+def test_event_queue_blocking_put_after_close():
+    queue = EventQueue(maxsize=1, policy=QueuePolicy.BLOCK)
+    queue.put(Event(event_type=EventType.OUTCOME, event_payload=["a"]))
+    queue.close()
+
+    # run in a thread, so a hanging put can't block the test run
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            queue.put(Event(event_type=EventType.OUTCOME, event_payload=["b"]))
+        ),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=1)
+    assert results == [False]
+    assert queue.dropped == 1
+
+
+def test_event_queue_coalesces_list_payloads():
+    queue = EventQueue(maxsize=1, policy=QueuePolicy.COALESCE)
+    for nodeid in ["test_a", "test_b", "test_c"]:
+        queue.put(Event(event_type=EventType.SCHEDULED, event_payload=[nodeid]))
+
+    assert len(queue) == 1
+    assert queue.get().event_payload == ["test_a", "test_b", "test_c"]
+    assert queue.dropped == 0
+
+
+class RecordingSender:
+    def __init__(self):
+        self.events = []
+
+    def send(self, event: Event) -> bool:
+        self.events.append(event)
+        return True
+
+
+def test_event_batcher_flushes_full_batches():
+    sender = RecordingSender()
+    batcher = EventBatcher(
+        sender=sender, event_type=EventType.OUTCOME, batch_size=3, flush_interval=60
+    )
+    for index in range(7):
+        batcher.add({"nodeid": f"test_{index}", "outcome": "PASSED"})
+
+    assert [len(event.event_payload) for event in sender.events] == [3, 3]
+
+    batcher.flush()
+    assert [len(event.event_payload) for event in sender.events] == [3, 3, 1]
+    assert all(event.event_type == EventType.OUTCOME for event in sender.events)
+    batcher.close()
+
+
+def test_event_batcher_flushes_after_interval():
+    sender = RecordingSender()
+    batcher = EventBatcher(
+        sender=sender, event_type=EventType.OUTCOME, batch_size=100, flush_interval=0.05
+    )
+    batcher.add({"nodeid": "test_a", "outcome": "PASSED"})
+    batcher.add({"nodeid": "test_b", "outcome": "FAILED"})
+    assert not sender.events
+
+    time.sleep(0.2)
+    assert len(sender.events) == 1
+    assert sender.events[0].event_payload == [
+        {"nodeid": "test_a", "outcome": "PASSED"},
+        {"nodeid": "test_b", "outcome": "FAILED"},
+    ]
+    batcher.close()
+
+
+def test_event_batcher_keeps_one_flusher_thread():
+    sender = RecordingSender()
+    batcher = EventBatcher(
+        sender=sender, event_type=EventType.OUTCOME, batch_size=100, flush_interval=0.02
+    )
+    for index in range(3):
+        batcher.add({"nodeid": f"test_{index}", "outcome": "PASSED"})
+        time.sleep(0.1)
+    assert len(sender.events) == 3
+
+    flusher_threads = [
+        thread for thread in threading.enumerate() if thread.name == "ayu-event-batcher"
+    ]
+    assert flusher_threads == [batcher._thread]
+
+    batcher.add({"nodeid": "test_3", "outcome": "PASSED"})
+    batcher.close()
+    assert len(sender.events) == 4
+    assert not flusher_threads[0].is_alive()
+
+
+async def test_sender_compresses_large_events(start_dispatcher):
+    received = []
+    await start_dispatcher(port=1353, received=received)
+
+    sender = EventSender(host="localhost", port=1353, compress_threshold=1000)
+    assert await asyncio.to_thread(sender.connect)
+
+    small_outcome = [{"nodeid": "test_a", "outcome": "PASSED"}]
+    large_outcome = [
+        {"nodeid": f"test_{index}", "outcome": "PASSED"} for index in range(100)
+    ]
+    for payload in [small_outcome, large_outcome]:
+        event = Event(event_type=EventType.OUTCOME, event_payload=payload)
+        assert await asyncio.to_thread(sender.send, event)
+
+    # both batches may be merged into a single dispatch
+    for _ in range(100):
+        outcomes = [outcome for batch in received for outcome in batch]
+        if len(outcomes) == 101:
+            break
+        await asyncio.sleep(0.01)
+    assert outcomes == [*small_outcome, *large_outcome]
+    assert sender.stats.events == 2
+    assert sender.stats.compressed_events == 1
+    assert sender.stats.compression_ratio > 2
+
+    await asyncio.to_thread(sender.close)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="No unix sockets")
+async def test_sender_over_unix_socket(tmp_path, start_dispatcher):
+    received = []
+    socket_path = (tmp_path / "ayu.sock").as_posix()
+    await start_dispatcher(port=0, received=received, socket_path=socket_path)
+
+    sender = EventSender(socket_path=socket_path)
+    assert await asyncio.to_thread(sender.connect)
+    event = Event(
+        event_type=EventType.OUTCOME,
+        event_payload=[{"nodeid": "test_a", "outcome": "PASSED"}],
+    )
+    assert await asyncio.to_thread(sender.send, event)
+
+    await wait_for(received, 1)
+    assert received == [[{"nodeid": "test_a", "outcome": "PASSED"}]]
+
+    await asyncio.to_thread(sender.close)
+
+
+async def test_dispatch_sync_and_async_handlers():
+    dispatcher = EventDispatcher()
+    received = []
+
+    async def async_handler(data):
+        await asyncio.sleep(0)
+        received.append(("async", data))
+
+    dispatcher.register_handler(
+        event_type=EventType.REPORT,
+        handler=lambda data: received.append(("sync", data)),
+    )
+    dispatcher.register_handler(event_type=EventType.REPORT, handler=async_handler)
+
+    await dispatcher.dispatch(Event(event_type=EventType.REPORT, event_payload={}))
+    # events without handlers are ignored
+    await dispatcher.dispatch(Event(event_type=EventType.DEBUG, event_payload={}))
+
+    assert received == [("sync", {}), ("async", {})]
+    assert dispatcher.handler_stats[EventType.REPORT].calls == 2
+    assert EventType.DEBUG not in dispatcher.handler_stats
+
+
+async def test_dispatch_reports_slow_handlers():
+    dispatcher = EventDispatcher()
+    dispatcher.SLOW_HANDLER_TIME = 0.01
+    slow_handlers = []
+    dispatcher.on_slow_handler = lambda event_type, handler, duration: (
+        slow_handlers.append(event_type)
+    )
+
+    async def slow_handler(data):
+        await asyncio.sleep(0.02)
+
+    dispatcher.register_handler(event_type=EventType.COLLECTION, handler=slow_handler)
+    await dispatcher.dispatch(Event(event_type=EventType.COLLECTION, event_payload={}))
+
+    assert slow_handlers == [EventType.COLLECTION]
+    assert dispatcher.handler_stats[EventType.COLLECTION].slow_calls == 1
+
+
+def test_merge_events():
+    events = [
+        Event(event_type=EventType.OUTCOME, event_payload=[1]),
+        Event(event_type=EventType.OUTCOME, event_payload=[2, 3]),
+        Event(event_type=EventType.REPORT, event_payload={}),
+        Event(event_type=EventType.OUTCOME, event_payload=[4]),
+    ]
+
+    assert EventDispatcher.merge_events(events=events) == [
+        Event(event_type=EventType.OUTCOME, event_payload=[1, 2, 3]),
+        Event(event_type=EventType.REPORT, event_payload={}),
+        Event(event_type=EventType.OUTCOME, event_payload=[4]),
+    ]
+
+
+async def test_dispatch_continues_after_failing_handler(start_dispatcher):
+    received = []
+    dispatcher = await start_dispatcher(port=1359, received=received)
+
+    def failing_handler(data):
+        raise ValueError("broken handler")
+
+    dispatcher.register_handler(event_type=EventType.REPORT, handler=failing_handler)
+    for event_type in [EventType.REPORT, EventType.OUTCOME]:
+        dispatcher.events.put_nowait(Event(event_type=event_type, event_payload=[]))
+
+    await wait_for(received, 1)
+    assert received == [[]]
+    assert not dispatcher._dispatch_task.done()
+
+
+async def test_sender_thread_survives_failing_events(start_dispatcher):
+    received = []
+    await start_dispatcher(port=1360, received=received)
+
+    sender = EventSender(host="localhost", port=1360)
+    assert await asyncio.to_thread(sender.connect)
+    sender.start()
+
+    # sets can't be encoded as json
+    sender.send(Event(event_type=EventType.OUTCOME, event_payload={"a": {1}}))
+    sender.send(Event(event_type=EventType.OUTCOME, event_payload={"nodeid": "test_a"}))
+    assert await asyncio.to_thread(sender.flush, 5)
+    await wait_for(received, 1)
+    assert received == [{"nodeid": "test_a"}]
+
+    await asyncio.to_thread(sender.close)
+
+
+def test_sender_stops_queueing_without_app():
+    sender = EventSender(host="localhost", port=1361, queue_policy=QueuePolicy.BLOCK)
+    assert not sender.connect()
+    sender.start()
+
+    event = Event(event_type=EventType.OUTCOME, event_payload={"nodeid": "test_a"})
+    assert not sender.send(event)
+    assert len(sender.queue) == 0
+    sender.close()
+
+
+@pytest.mark.parametrize("xdist_options", [[], ["-n", "2"]])
+async def test_plugin_sends_reports_with_xdist_installed(
+    start_dispatcher, testcase_path, tmp_path, monkeypatch, xdist_options
+):
+    port = 1362 if not xdist_options else 1363
+    received = []
+    dispatcher = await start_dispatcher(port=port, received=received)
+    reports = []
+    dispatcher.register_handler(
+        event_type=EventType.REPORT, handler=lambda data: reports.extend(data)
+    )
+
+    monkeypatch.setenv("AYU_HOST", "localhost")
+    monkeypatch.setenv("AYU_PORT", str(port))
+    monkeypatch.setenv("AYU_REPORT_STORE", (tmp_path / "reports").as_posix())
+    monkeypatch.delenv("AYU_SOCKET", raising=False)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "pytest",
+        "-p",
+        "no:cacheprovider",
+        "-o",
+        "addopts=",
+        (testcase_path / "test_a").as_posix(),
+        *xdist_options,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    await asyncio.wait_for(process.wait(), timeout=60)
+    await wait_for(reports, 5)
+
+    # test_a/test_mod2.py has 5 tests, 3 of them fail
+    assert sorted(outcome["nodeid"] for batch in received for outcome in batch) == (
+        sorted(report["nodeid"] for report in reports)
+    )
+    assert len(reports) == 5
+    assert sum(report["outcome"] == "failed" for report in reports) == 3
@@ -0,0 +1,44 @@
+from ayu.classes.report_store import ReportStore, summarize_report
+
+
+def report(nodeid: str, outcome: str, text: str = "") -> dict:
+    return {
+        "nodeid": nodeid,
+        "outcome": outcome,
+        "duration": 0.5,
+        "longreprtext": text,
+        "caplog": "captured log",
+    }
+
+
+def test_report_store(tmp_path):
+    store = ReportStore(path=tmp_path / "reports" / "reports.sqlite")
+    store.add(report=report("test_a.py::test_a", "failed", "E   assert False"))
+    store.add(report=report("test_a.py::test_b", "passed"))
+    assert store.get(nodeid="test_a.py::test_a")["longreprtext"] == "E   assert False"
+    assert store.get(nodeid="test_a.py::test_c") is None
+
+    # the latest report of a test replaces the earlier one
+    store.add(report=report("test_a.py::test_a", "passed"))
+    assert [
+        report["outcome"]
+        for report in store.get_many(["test_a.py::test_a", "test_a.py::test_c"])
+    ] == ["passed"]
+
+    # a second connection, like the app reading while the plugin writes
+    reader = ReportStore(path=tmp_path / "reports" / "reports.sqlite")
+    assert reader.get(nodeid="test_a.py::test_b")["caplog"] == "captured log"
+
+    store.clear()
+    assert reader.get(nodeid="test_a.py::test_b") is None
+    reader.close()
+    store.close()
+
+
+def test_summarize_report():
+    summary = summarize_report(report=report("test_a.py::test_a", "failed", "E"))
+    assert summary == {
+        "nodeid": "test_a.py::test_a",
+        "outcome": "failed",
+        "duration": 0.5,
+    }
@@ -0,0 +1,61 @@
+from ayu.classes.search_index import SearchIndex
+from ayu.classes.test_store import TestStore
+
+
+def build_store(make_node, names: list[str]) -> TestStore:
+    store = TestStore()
+    module_id = store.add(
+        node_data=make_node("tests/test_mod.py", "MODULE", children=[{}])
+    )
+    store.set_visible(node_id=module_id, is_visible=True)
+    for name in names:
+        node_id = store.add(
+            node_data=make_node(name, nodeid=f"tests/test_mod.py::{name}"),
+            parent_id=module_id,
+        )
+        store.set_visible(node_id=node_id, is_visible=True)
+    return store
+
+
+def test_search_index(make_node):
+    store = build_store(make_node, ["test_sum", "test_fail", "test_summary"])
+    search_index = SearchIndex(store=store)
+
+    def nodeids(node_ids: list[int]) -> list[str]:
+        return [store.nodeids[node_id] for node_id in node_ids]
+
+    assert nodeids(search_index.search(query="fail")) == [
+        "tests/test_mod.py::test_fail"
+    ]
+    # exact name matches first, shorter nodeids rank higher
+    assert nodeids(search_index.search(query="SUM")) == [
+        "tests/test_mod.py::test_sum",
+        "tests/test_mod.py::test_summary",
+    ]
+    assert search_index.search(query="xyz") == []
+    assert nodeids(search_index.search(query="mod", node_types=["MODULE"])) == [
+        "tests/test_mod.py"
+    ]
+    assert len(search_index.search(query="", limit=2)) == 2
+
+    # hidden nodes are not found
+    store.set_visible(
+        node_id=store.ids["tests/test_mod.py::test_fail"], is_visible=False
+    )
+    assert search_index.search(query="fail") == []
+
+
+def test_search_index_rebuild(make_node):
+    store = build_store(make_node, ["test_sum"])
+    search_index = SearchIndex(store=store)
+    assert search_index.search(query="other") == []
+
+    node_id = store.add(
+        node_data=make_node("test_other", nodeid="tests/test_mod.py::test_other"),
+        parent_id=0,
+    )
+    store.set_visible(node_id=node_id, is_visible=True)
+    assert search_index.search(query="other") == [node_id]
+
+    store.clear()
+    assert search_index.search(query="other") == []
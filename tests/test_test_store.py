@@ -0,0 +1,60 @@
+from ayu.classes.test_store import TestStore
+from ayu.utils import TestOutcome
+
+
+def build_store(make_node) -> TestStore:
+    store = TestStore()
+    module_id = store.add(node_data=make_node("test_a.py", "MODULE", children=[{}]))
+    for name, markers in [("test_b", ["slow"]), ("test_c", []), ("test_d", ["slow"])]:
+        store.add(
+            node_data=make_node(name, nodeid=f"test_a.py::{name}", markers=markers),
+            parent_id=module_id,
+        )
+    return store
+
+
+def test_store_columns(make_node):
+    store = build_store(make_node)
+    assert len(store) == 4
+    assert store.test_count == 3
+    assert list(store.get_parent_ids(node_id=store.ids["test_a.py::test_c"])) == [0]
+    assert store.marker_index["slow"] == [1, 3]
+
+    assert store.set_status(node_id=1, status=TestOutcome.PASSED) == ""
+    assert store.get_status(node_id=1) == TestOutcome.PASSED
+
+    store.reset_results()
+    assert store.get_status(node_id=1) == ""
+    assert len(store.duration) == len(store)
+
+
+def test_store_select(make_node):
+    store = build_store(make_node)
+    store.set_status(node_id=1, status=TestOutcome.PASSED)
+    store.set_status(node_id=2, status=TestOutcome.FAILED)
+    store.set_status(node_id=3, status=TestOutcome.PASSED)
+    assert store.select(store.status_bits([TestOutcome.PASSED])) == [1, 3]
+    assert store.select(store.status_bits([""])) == [0]
+
+    store.visible[2] = store.visible[3] = 1
+    assert store.visible_ids() == [2, 3]
+
+
+def test_store_marked_tests(make_node):
+    store = build_store(make_node)
+    assert not store.has_marked_tests
+    for node_id in [3, 1, 2]:
+        store.set_visible(node_id=node_id, is_visible=True)
+        store.set_favourite(node_id=node_id, is_fav=True)
+    # parents are not marked as test
+    store.set_favourite(node_id=0, is_fav=True)
+    assert store.has_marked_tests
+    assert store.marked_nodeids() == [
+        "test_a.py::test_b",
+        "test_a.py::test_c",
+        "test_a.py::test_d",
+    ]
+
+    store.set_visible(node_id=2, is_visible=False)
+    store.set_favourite(node_id=3, is_fav=False)
+    assert store.marked_nodeids() == ["test_a.py::test_b"]
@@ -0,0 +1,99 @@
+import os
+
+from ayu.classes.test_store import TestStore
+from ayu.classes.text_index import InvertedIndex, TextIndex
+
+TEST_SOURCE = '''import pytest
+
+
+def test_connection():
+    """Reconnects after the server closed the socket"""
+    assert reconnect()
+
+
+@pytest.mark.parametrize("value", [1, 2])
+def test_values(value):
+    assert value
+'''
+
+
+def build_store(make_node, path: str) -> TestStore:
+    store = TestStore()
+    module_id = store.add(node_data=make_node(path, "MODULE", children=[{}]))
+    for name, lineno in [
+        ("test_connection", 3),
+        ("test_values[1]", 9),
+        ("test_values[2]", 9),
+    ]:
+        node_id = store.add(
+            node_data=make_node(
+                name, nodeid=f"{path}::{name}", path=path, lineno=lineno
+            ),
+            parent_id=module_id,
+        )
+        store.set_visible(node_id=node_id, is_visible=True)
+    return store
+
+
+def test_inverted_index():
+    index = InvertedIndex()
+    index.add(doc_id="a", text="ConnectionResetError: reset by peer")
+    index.add(doc_id="b", text="AssertionError: assert 1 == 2")
+    assert set(index.search(tokens=["assert"])) == {"b"}
+    # the last token matches as prefix
+    assert set(index.search(tokens=["conn"])) == {"a"}
+    assert set(index.search(tokens=["reset", "by"])) == {"a"}
+    assert index.search(tokens=["reset", "assert"]) == {}
+
+    index.add(doc_id="a", text="passed")
+    assert index.search(tokens=["connectionreseterror"]) == {}
+
+
+def test_text_index(tmp_path, make_node):
+    test_file = tmp_path / "test_mod.py"
+    test_file.write_text(TEST_SOURCE)
+    path = test_file.as_posix()
+    store = build_store(make_node, path=path)
+    text_index = TextIndex(store=store)
+    text_index.update_sources()
+
+    # docstring and body
+    assert text_index.search(query="socket") == [f"{path}::test_connection"]
+    assert text_index.search(query="reconnect") == [f"{path}::test_connection"]
+    assert sorted(text_index.search(query="value")) == [
+        f"{path}::test_values[1]",
+        f"{path}::test_values[2]",
+    ]
+
+    text_index.index_reports(
+        [
+            {
+                "nodeid": f"{path}::test_values[2]",
+                "longreprtext": "E   ConnectionResetError: [Errno 104]",
+            }
+        ]
+    )
+    assert text_index.search(query="connectionreset") == [f"{path}::test_values[2]"]
+
+    text_index.clear_reports()
+    assert not text_index.search(query="connectionreset")
+
+
+def test_text_index_reindex_changed_files(tmp_path, make_node):
+    test_file = tmp_path / "test_mod.py"
+    test_file.write_text(TEST_SOURCE)
+    path = test_file.as_posix()
+    text_index = TextIndex(store=build_store(make_node, path=path))
+    text_index.update_sources()
+
+    # unchanged files are not read again
+    test_file.write_text(TEST_SOURCE.replace("socket", "pipe"))
+    mtime = text_index.indexed_files[path][0]
+    os.utime(path, (mtime, mtime))
+    text_index.update_sources()
+    assert text_index.search(query="socket")
+
+    os.utime(path, (mtime + 1, mtime + 1))
+    text_index.update_sources()
+    assert not text_index.search(query="socket")
+    assert text_index.search(query="pipe") == [f"{path}::test_connection"]
@@ -1,4 +1,15 @@
-from ayu.utils import get_ayu_websocket_host_port
+from ayu.utils import (
+    ReportLineType,
+    classify_report_lines,
+    expand_flat_tree,
+    flatten_dict_tree,
+    get_ayu_websocket_host_port,
+    get_coverage_data,
+    iter_coverage_data,
+    get_preview_test,
+    get_report_store_path,
+    get_source_file,
+)
 
 
 def test_to_come():
@@ -10,3 +21,144 @@ def test_port_and_host(test_port, test_host):
 
     assert host == "localhost"
     assert port == 1338
+
+
+def test_report_store_path_per_instance(tmp_path):
+    assert get_report_store_path(port=1337) != get_report_store_path(port=1338)
+    # instances with sockets keep the default port
+    assert get_report_store_path(
+        port=1337, socket_path=(tmp_path / "a.sock").as_posix()
+    ) != get_report_store_path(port=1337, socket_path=(tmp_path / "b.sock").as_posix())
+
+
+def test_flat_tree_roundtrip(make_node):
+    root = make_node("tests", "DIR")
+    module = make_node("test_mod.py", "MODULE", root, nodeid="tests/test_mod.py")
+    test_class = make_node("TestClass", "CLASS", module)
+    make_node("test_a", "FUNCTION", test_class, lineno=3)
+    make_node("test_b[1]", "FUNCTION", module, lineno=3)
+    make_node("test_c", "FUNCTION", module, markers=["slow"], lineno=3)
+    collection = {
+        "tree": {"tests": root},
+        "meta": {"test_count": 3, "markers": ["slow"], "collected": 3},
+    }
+
+    flat_collection = flatten_dict_tree(data=collection)
+
+    assert flat_collection["nodes"]["parent"] == [None, 0, 1, 2, 1, 1]
+    # only nodeids, which can't be derived from the parent are sent
+    assert flat_collection["nodes"]["nodeid"] == [
+        "tests",
+        "tests/test_mod.py",
+        None,
+        None,
+        None,
+        None,
+    ]
+    assert flat_collection["markers"] == ["slow"]
+    assert expand_flat_tree(data=flat_collection) == collection
+
+
+PREVIEW_SOURCE = """import pytest
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("value", [1])
+def test_decorated(value):
+
+    assert value
+
+
+class TestOuter:
+    class TestInner:
+        def test_inner(self):
+            assert True
+
+    def test_outer(self):
+        assert True
+"""
+
+
+def test_get_preview_test(tmp_path):
+    test_file = tmp_path / "test_preview.py"
+    test_file.write_text(PREVIEW_SOURCE)
+    lines = PREVIEW_SOURCE.splitlines()
+
+    # decorators and blank lines within the test are part of the preview
+    assert get_preview_test(file_path=test_file, start_line_no=3) == "\n".join(
+        lines[3:8]
+    )
+    # nested classes end with their last method
+    assert get_preview_test(file_path=test_file, start_line_no=10) == "\n".join(
+        lines[10:17]
+    )
+    assert get_preview_test(file_path=test_file, start_line_no=11) == "\n".join(
+        lines[11:14]
+    )
+    assert get_preview_test(file_path=test_file, start_line_no=15) == "\n".join(
+        lines[15:17]
+    )
+
+
+def test_source_file_cache(tmp_path):
+    test_file = tmp_path / "test_cache.py"
+    test_file.write_text(PREVIEW_SOURCE)
+    source_file = get_source_file(file_path=test_file)
+    assert get_source_file(file_path=test_file) is source_file
+
+    test_file.write_text(PREVIEW_SOURCE + "\n\ndef test_new():\n    pass\n")
+    changed_source_file = get_source_file(file_path=test_file)
+    assert changed_source_file is not source_file
+    assert changed_source_file.get_definition(start_line_no=19) == (
+        "def test_new():\n    pass"
+    )
+
+
+def test_classify_report_lines():
+    report = """def test_a():
+>       assert 1 == 2
+E       assert 1 == 2
+
+tests/test_a.py:2: AssertionError
+Traceback (most recent call last):
+  File "tests/test_b.py", line 2, in test_b
+    raise ValueError
+ValueError"""
+    assert list(classify_report_lines(report.splitlines())) == [
+        ReportLineType.TEXT,
+        ReportLineType.FAILED_LINE,
+        ReportLineType.ERROR,
+        ReportLineType.TEXT,
+        ReportLineType.LOCATION,
+        ReportLineType.TEXT,
+        ReportLineType.TEXT,
+        ReportLineType.TEXT,
+        ReportLineType.ERROR,
+    ]
+
+
+def test_coverage_data_in_parts(tmp_path, monkeypatch):
+    import coverage
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("ayu.utils.COVERAGE_CHUNK_SIZE", 2)
+    data = coverage.CoverageData(basename=".coverage")
+    for index in range(5):
+        module = tmp_path / f"module_{index}.py"
+        module.write_text("a = 1\nif a:\n    b = 2\nelse:\n    b = 3\n")
+        data.add_lines({module.as_posix(): [1, 2, 3]})
+    data.write()
+
+    # the parts arrive in the order they finish
+    parts = list(iter_coverage_data(workers=2))
+    assert sorted(list(part) for part in parts) == [
+        ["module_0.py", "module_1.py"],
+        ["module_2.py", "module_3.py"],
+        ["module_4.py"],
+    ]
+    coverage_data = get_coverage_data(workers=2)
+    assert coverage_data["module_0.py"]["lines_missing"] == [5]
+    assert list(coverage_data) == [f"module_{index}.py" for index in range(5)]
+    assert get_coverage_data(workers=1) == {
+        path: file_data for part in parts for path, file_data in part.items()
+    }